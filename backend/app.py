@@ -316,6 +316,13 @@ async def chat(request: ChatRequest):
         }
 
 
+# SSE 输出队列容量：慢客户端时 agent 可先行最多这么多事件，仅在积压饱和时才产生背压
+_SSE_QUEUE_MAXSIZE = 256
+
+# 合并 token 事件时单帧最多包含的 token 数（另受 settings.sse_coalesce_ms 时间窗口限制）
+_SSE_COALESCE_MAX_TOKENS = 8
+
+
 async def _stream_agent_response(message: str, history: list, session_id: str, debug: bool = False):
     """Generator for SSE streaming — 通过统一输出队列合并 agent 事件和审批事件。
 
@@ -334,11 +341,18 @@ async def _stream_agent_response(message: str, history: list, session_id: str, d
     set_session_id(session_id)
 
     # 统一输出队列：合并 agent 事件和审批事件
-    output_queue: asyncio.Queue = asyncio.Queue()
+    output_queue: asyncio.Queue = asyncio.Queue(maxsize=_SSE_QUEUE_MAXSIZE)
+
+    async def put_event(event):
+        """入队事件：队列未满时同步放入，饱和时才等待消费端。"""
+        try:
+            output_queue.put_nowait(event)
+        except asyncio.QueueFull:
+            await output_queue.put(event)
 
     # 审批回调直接写入输出队列，不经过 ctx.approval_queue，避免死锁
     async def sse_approval_callback(data):
-        await output_queue.put(data)
+        await put_event(data)
 
     try:
         from security import security_gate
@@ -364,21 +378,44 @@ async def _stream_agent_response(message: str, history: list, session_id: str, d
     async def pump_agent_events():
         try:
             async for event in run_agent(message, history, ctx, middlewares=[debug_mw]):
-                await output_queue.put(event)
+                await put_event(event)
         except Exception as e:
             logger.error(f"Agent 事件流异常: {e}", exc_info=True)
-            await output_queue.put(events.build_error(str(e)))
-        finally:
-            # 发送结束哨兵，通知主循环退出
-            await output_queue.put(None)
+            await put_event(events.build_error(str(e)))
+        # 发送结束哨兵，通知主循环退出
+        # （被取消时主循环已退出，不再入队，避免在已满的队列上永久阻塞）
+        await put_event(None)
 
     pump_task = asyncio.create_task(pump_agent_events())
 
+    # token 合并缓冲：连续 token 先累积，满 N 个 / 超出时间窗口 / 遇到其他事件时合并为一帧发送
+    coalesce_window = max(settings.sse_coalesce_ms, 0) / 1000
+    token_buf: list[str] = []
+    token_head: Optional[dict] = None
+    buf_started = 0.0
+
+    def flush_tokens() -> str:
+        nonlocal token_head
+        merged = {**token_head, "content": "".join(token_buf)}
+        token_buf.clear()
+        token_head = None
+        return serialize_sse(merged)
+
     try:
         while True:
-            event = await output_queue.get()
+            if token_buf:
+                remaining = coalesce_window - (time.monotonic() - buf_started)
+                try:
+                    event = await asyncio.wait_for(output_queue.get(), timeout=max(remaining, 0))
+                except asyncio.TimeoutError:
+                    yield flush_tokens()
+                    continue
+            else:
+                event = await output_queue.get()
             # None 为结束哨兵，表示 agent 事件流已结束
             if event is None:
+                if token_buf:
+                    yield flush_tokens()
                 break
 
             event_type = event.get("type", "")
@@ -450,6 +487,16 @@ async def _stream_agent_response(message: str, history: list, session_id: str, d
                 })
 
             # 发送 SSE 到客户端
+            if event_type == "token" and coalesce_window > 0:
+                if not token_buf:
+                    token_head = event
+                    buf_started = time.monotonic()
+                token_buf.append(event.get("content", ""))
+                if len(token_buf) >= _SSE_COALESCE_MAX_TOKENS:
+                    yield flush_tokens()
+                continue
+            if token_buf:
+                yield flush_tokens()
             yield serialize_sse(event)
 
             if event_type == "done":
@@ -477,6 +524,8 @@ async def _stream_agent_response(message: str, history: list, session_id: str, d
 
     except Exception as e:
         logger.error(f"SSE 流异常: {e}", exc_info=True)
+        if token_buf:
+            yield flush_tokens()
         yield serialize_sse(events.build_error(str(e)))
     finally:
         try:
@@ -524,10 +573,20 @@ async def _do_session_reflect(session_id: str, tool_calls_log: list) -> None:
 # 计划审批端点
 # ============================================
 
-# 全局注册表：plan_id → (queue, timestamp)（由 runner 注册）
+# 全局注册表：plan_id → _PendingPlanApproval（由 runner 注册，审批结束后由 runner 注销）
 # 添加时间戳用于过期清理，防止内存泄漏
 import time
-_plan_approval_contexts: dict[str, tuple[asyncio.Queue, float]] = {}
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class _PendingPlanApproval:
+    """待审批计划：审批结果投递队列 + 注册时间。"""
+    queue: asyncio.Queue
+    created_at: float
+
+
+_plan_approval_contexts: dict[str, _PendingPlanApproval] = {}
 _PLAN_APPROVAL_TIMEOUT = 600  # 10 分钟过期
 
 
@@ -538,15 +597,20 @@ def register_plan_approval_context(plan_id: str, queue: asyncio.Queue) -> None:
     """
     # 先清理过期条目
     _cleanup_expired_plan_contexts()
-    _plan_approval_contexts[plan_id] = (queue, time.time())
+    _plan_approval_contexts[plan_id] = _PendingPlanApproval(queue, time.time())
+
+
+def unregister_plan_approval_context(plan_id: str) -> None:
+    """注销计划审批上下文（runner 等待结束后调用，含超时 / 断开连接）。"""
+    _plan_approval_contexts.pop(plan_id, None)
 
 
 def _cleanup_expired_plan_contexts() -> None:
     """清理过期的计划审批上下文，防止内存泄漏。"""
     now = time.time()
     expired = [
-        plan_id for plan_id, (_, ts) in _plan_approval_contexts.items()
-        if now - ts > _PLAN_APPROVAL_TIMEOUT
+        plan_id for plan_id, pending in _plan_approval_contexts.items()
+        if now - pending.created_at > _PLAN_APPROVAL_TIMEOUT
     ]
     for plan_id in expired:
         _plan_approval_contexts.pop(plan_id, None)
@@ -561,10 +625,9 @@ class PlanApprovalRequest(BaseModel):
 @app.post("/api/plan/approve")
 async def approve_plan(request: PlanApprovalRequest):
     """审批或拒绝待执行的计划。"""
-    entry = _plan_approval_contexts.pop(request.plan_id, None)
-    if entry is not None:
-        queue, _ = entry  # 解构 (queue, timestamp) 元组
-        await queue.put({"approved": request.approved})
+    pending = _plan_approval_contexts.pop(request.plan_id, None)
+    if pending is not None:
+        await pending.queue.put({"approved": request.approved})
         return {"status": "ok", "plan_id": request.plan_id, "approved": request.approved}
     else:
         raise HTTPException(status_code=404, detail="Plan approval request not found or expired")
@@ -804,7 +867,7 @@ async def get_session(session_id: str):
     return {
         "session_id": session_id,
         "messages": session_data.get("messages", []),
-        "debug_calls": session_data.get("debug_calls", []),
+        "debug_calls": session_manager.get_debug_calls(session_id),
         "plan": session_data.get("plan"),
     }
 
@@ -1520,10 +1583,14 @@ class SettingsUpdateRequest(BaseModel):
     enable_llm_cache: Optional[bool] = None
     enable_prompt_cache: Optional[bool] = None
     enable_translate_cache: Optional[bool] = None
+    enable_semantic_cache: Optional[bool] = None
     url_cache_ttl: Optional[int] = None
     llm_cache_ttl: Optional[int] = None
     prompt_cache_ttl: Optional[int] = None
     translate_cache_ttl: Optional[int] = None
+    semantic_cache_ttl: Optional[int] = None
+    semantic_cache_threshold: Optional[float] = None
+    semantic_cache_max_items: Optional[int] = None
     cache_max_memory_items: Optional[int] = None
     cache_max_disk_size_mb: Optional[int] = None
     # Memory configuration
@@ -1659,10 +1726,14 @@ async def get_settings():
         "enable_llm_cache": env.get("ENABLE_LLM_CACHE", "false").lower() == "true",
         "enable_prompt_cache": env.get("ENABLE_PROMPT_CACHE", "true").lower() == "true",
         "enable_translate_cache": env.get("ENABLE_TRANSLATE_CACHE", "true").lower() == "true",
+        "enable_semantic_cache": env.get("ENABLE_SEMANTIC_CACHE", "false").lower() == "true",
         "url_cache_ttl": int(env.get("URL_CACHE_TTL", "3600")),
         "llm_cache_ttl": int(env.get("LLM_CACHE_TTL", "86400")),
         "prompt_cache_ttl": int(env.get("PROMPT_CACHE_TTL", "600")),
         "translate_cache_ttl": int(env.get("TRANSLATE_CACHE_TTL", "604800")),
+        "semantic_cache_ttl": int(env.get("SEMANTIC_CACHE_TTL", "86400")),
+        "semantic_cache_threshold": float(env.get("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+        "semantic_cache_max_items": int(env.get("SEMANTIC_CACHE_MAX_ITEMS", "10000")),
         "cache_max_memory_items": int(env.get("CACHE_MAX_MEMORY_ITEMS", "100")),
         "cache_max_disk_size_mb": int(env.get("CACHE_MAX_DISK_SIZE_MB", "5120")),
         # Memory configuration
@@ -1724,10 +1795,14 @@ async def update_settings(request: SettingsUpdateRequest):
         "ENABLE_LLM_CACHE": str(request.enable_llm_cache).lower() if request.enable_llm_cache is not None else None,
         "ENABLE_PROMPT_CACHE": str(request.enable_prompt_cache).lower() if request.enable_prompt_cache is not None else None,
         "ENABLE_TRANSLATE_CACHE": str(request.enable_translate_cache).lower() if request.enable_translate_cache is not None else None,
+        "ENABLE_SEMANTIC_CACHE": str(request.enable_semantic_cache).lower() if request.enable_semantic_cache is not None else None,
         "URL_CACHE_TTL": str(request.url_cache_ttl) if request.url_cache_ttl is not None else None,
         "LLM_CACHE_TTL": str(request.llm_cache_ttl) if request.llm_cache_ttl is not None else None,
         "PROMPT_CACHE_TTL": str(request.prompt_cache_ttl) if request.prompt_cache_ttl is not None else None,
         "TRANSLATE_CACHE_TTL": str(request.translate_cache_ttl) if request.translate_cache_ttl is not None else None,
+        "SEMANTIC_CACHE_TTL": str(request.semantic_cache_ttl) if request.semantic_cache_ttl is not None else None,
+        "SEMANTIC_CACHE_THRESHOLD": str(request.semantic_cache_threshold) if request.semantic_cache_threshold is not None else None,
+        "SEMANTIC_CACHE_MAX_ITEMS": str(request.semantic_cache_max_items) if request.semantic_cache_max_items is not None else None,
         "CACHE_MAX_MEMORY_ITEMS": str(request.cache_max_memory_items) if request.cache_max_memory_items is not None else None,
         "CACHE_MAX_DISK_SIZE_MB": str(request.cache_max_disk_size_mb) if request.cache_max_disk_size_mb is not None else None,
         # Memory configuration
@@ -1956,7 +2031,7 @@ async def list_mcp_servers():
     """List all MCP servers with their connection status."""
     try:
         from mcp_module import mcp_manager
-        servers = mcp_manager.get_server_status()
+        servers = await mcp_manager.get_server_status()
         return {"servers": servers}
     except Exception as e:
         logger.error(f"Failed to list MCP servers: {e}")
@@ -1968,11 +2043,11 @@ async def add_mcp_server(name: str, request: McpServerRequest):
     """Add a new MCP server configuration."""
     from mcp_module.config import get_server, set_server
 
-    if get_server(name):
+    if await get_server(name):
         raise HTTPException(status_code=409, detail=f"Server '{name}' already exists")
 
     config = request.model_dump(exclude_none=True)
-    set_server(name, config)
+    await set_server(name, config)
 
     # Auto-connect if enabled
     if config.get("enabled", True) and settings.mcp_enabled:
@@ -1991,7 +2066,7 @@ async def update_mcp_server(name: str, request: McpServerRequest):
     from mcp_module.config import get_server, set_server
     from mcp_module import mcp_manager
 
-    if not get_server(name):
+    if not await get_server(name):
         raise HTTPException(status_code=404, detail=f"Server '{name}' not found")
 
     # Disconnect first
@@ -2001,7 +2076,7 @@ async def update_mcp_server(name: str, request: McpServerRequest):
         pass
 
     config = request.model_dump(exclude_none=True)
-    set_server(name, config)
+    await set_server(name, config)
 
     # Reconnect if enabled
     if config.get("enabled", True) and settings.mcp_enabled:
@@ -2025,7 +2100,7 @@ async def delete_mcp_server(name: str):
     except Exception:
         pass
 
-    if not cfg_delete(name):
+    if not await cfg_delete(name):
         raise HTTPException(status_code=404, detail=f"Server '{name}' not found")
 
     return {"status": "ok", "deleted": name}
@@ -2063,7 +2138,7 @@ async def list_all_mcp_tools():
     from mcp_module import mcp_manager
 
     all_tools = []
-    status = mcp_manager.get_server_status()
+    status = await mcp_manager.get_server_status()
     for srv_name, srv_info in status.items():
         if srv_info.get("status") == "connected":
             for tool in mcp_manager.get_server_tools(srv_name):
@@ -2269,13 +2344,17 @@ async def delete_pool_model(model_id: str):
 # 缓存端点
 # ============================================
 def _get_core_cache_map() -> dict:
-    """Get the 4 core cache instances."""
-    from cache import url_cache, llm_cache, prompt_cache, translate_cache
+    """Get the core cache instances.
+
+    semantic 为纯内存缓存（无 l1/l2 分层、无磁盘条目），各端点按需跳过对应层。
+    """
+    from cache import url_cache, llm_cache, prompt_cache, translate_cache, semantic_cache
     return {
         "url": url_cache,
         "llm": llm_cache,
         "prompt": prompt_cache,
         "translate": translate_cache,
+        "semantic": semantic_cache,
     }
 
 
@@ -2337,7 +2416,7 @@ async def clear_cache(cache_type: str = Query(default="all")):
     Clear cache by type.
 
     Args:
-        cache_type: Cache type to clear (url, llm, prompt, translate, tool_*, all)
+        cache_type: Cache type to clear (url, llm, prompt, translate, semantic, tool_*, all)
     """
     try:
         core_map = _get_core_cache_map()
@@ -2391,13 +2470,17 @@ async def list_cache_entries(
         core_map = _get_core_cache_map()
 
         if cache_type in core_map:
-            disk_cache = core_map[cache_type].l2
+            disk_cache = getattr(core_map[cache_type], "l2", None)
         elif cache_type.startswith("tool_"):
             disk_cache = _get_tool_disk_cache(cache_type)
         else:
             raise HTTPException(status_code=400, detail=f"Invalid cache type: {cache_type}")
 
-        result = disk_cache.list_entries(page=page, page_size=page_size)
+        if disk_cache is None:
+            # 纯内存缓存没有可浏览的磁盘条目
+            result = {"entries": [], "total": 0, "page": page, "page_size": page_size}
+        else:
+            result = disk_cache.list_entries(page=page, page_size=page_size)
 
         return {
             "status": "ok",
@@ -2423,8 +2506,9 @@ async def delete_cache_entry(cache_type: str, key: str):
 
         if cache_type in core_map:
             cache = core_map[cache_type]
-            l1_deleted = cache.l1.delete(key)
-            l2_deleted = cache.l2.delete(key)
+            if hasattr(cache, "l1"):
+                l1_deleted = cache.l1.delete(key)
+                l2_deleted = cache.l2.delete(key)
         elif cache_type.startswith("tool_"):
             dc = _get_tool_disk_cache(cache_type)
             l2_deleted = dc.delete(key)
@@ -2456,13 +2540,16 @@ async def cleanup_cache():
         core_map = _get_core_cache_map()
         cleanup_results = {}
 
-        # Cleanup L1 (memory) for core caches
+        # Cleanup L1 (memory) for core caches（纯内存缓存自身即 L1）
         for name, cache in core_map.items():
-            expired_count = cache.l1.cleanup_expired()
+            l1 = cache.l1 if hasattr(cache, "l1") else cache
+            expired_count = l1.cleanup_expired()
             cleanup_results[f"{name}_l1_expired"] = expired_count
 
         # Cleanup L2 (disk) - expired + LRU for core caches
         for name, cache in core_map.items():
+            if not hasattr(cache, "l2"):
+                continue
             expired_count = cache.l2.cleanup_expired()
             lru_count = cache.l2.cleanup_lru()
             cleanup_results[f"{name}_l2_expired"] = expired_count
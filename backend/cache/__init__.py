@@ -4,6 +4,7 @@ Cache module for VibeWorker.
 Provides a two-tier caching system (L1 memory + L2 disk) for various components:
 - URL cache: Web page fetch results
 - LLM cache: Agent responses
+- Semantic cache: Agent responses for paraphrased questions (embedding similarity)
 - Prompt cache: System prompt concatenation results
 - Translate cache: Translation API results
 - Tool cache decorator: Generic caching for any tool
@@ -11,6 +12,7 @@ Provides a two-tier caching system (L1 memory + L2 disk) for various components:
 
 from .url_cache import URLCache
 from .llm_cache import LLMCache
+from .semantic_cache import SemanticCache
 from .prompt_cache import PromptCache
 from .translate_cache import TranslateCache
 from .tool_cache_decorator import ToolCacheDecorator, cached_tool
@@ -18,6 +20,7 @@ from .tool_cache_decorator import ToolCacheDecorator, cached_tool
 # Global cache instances (lazy initialized)
 _url_cache = None
 _llm_cache = None
+_semantic_cache = None
 _prompt_cache = None
 _translate_cache = None
 
@@ -38,6 +41,14 @@ def get_llm_cache() -> LLMCache:
     return _llm_cache
 
 
+def get_semantic_cache() -> SemanticCache:
+    """Get the global Semantic cache instance."""
+    global _semantic_cache
+    if _semantic_cache is None:
+        _semantic_cache = SemanticCache()
+    return _semantic_cache
+
+
 def get_prompt_cache() -> PromptCache:
     """Get the global Prompt cache instance."""
     global _prompt_cache
@@ -57,22 +68,26 @@ def get_translate_cache() -> TranslateCache:
 # Convenience exports
 url_cache = get_url_cache()
 llm_cache = get_llm_cache()
+semantic_cache = get_semantic_cache()
 prompt_cache = get_prompt_cache()
 translate_cache = get_translate_cache()
 
 __all__ = [
     "URLCache",
     "LLMCache",
+    "SemanticCache",
     "PromptCache",
     "TranslateCache",
     "ToolCacheDecorator",
     "cached_tool",
     "url_cache",
     "llm_cache",
+    "semantic_cache",
     "prompt_cache",
     "translate_cache",
     "get_url_cache",
     "get_llm_cache",
+    "get_semantic_cache",
     "get_prompt_cache",
     "get_translate_cache",
 ]
@@ -1,12 +1,14 @@
 """
 L1 Memory cache implementation using LRU eviction.
 
-线程安全增强：使用 threading.Lock 保护所有缓存操作。
+线程安全增强：按 key 哈希分段加锁（lock striping），不同分段的 key 可并发访问；
+单个 OrderedDict 方法调用在 GIL 下本身是原子的，锁只保护复合操作。
 """
 
 import threading
-import time
 from collections import OrderedDict
+from contextlib import contextmanager
+from time import monotonic as _now
 from typing import Any, Optional
 import logging
 
@@ -14,6 +16,14 @@ from .base import BaseCache, CacheStats
 
 logger = logging.getLogger(__name__)
 
+# 注：过期时间基于单调时钟（_now），不受系统时间/NTP 校时回拨影响
+
+# 未命中哨兵：单次 .get() 探测即可区分"不存在"与"值为 None"
+_MISSING = object()
+
+# 锁分段数（必须为 2 的幂，便于用位与取模）
+_LOCK_STRIPES = 16
+
 
 class MemoryCache(BaseCache):
     """
@@ -22,7 +32,7 @@ class MemoryCache(BaseCache):
     Features:
     - TTL (Time-To-Live) for automatic expiration
     - LRU (Least Recently Used) eviction when max size reached
-    - Thread-safe operations (使用锁保护)
+    - Thread-safe operations (分段锁保护)
     - Statistics tracking
     """
 
@@ -36,10 +46,27 @@ class MemoryCache(BaseCache):
         """
         self.max_size = max_size
         self.default_ttl = default_ttl
-        self._cache: OrderedDict[str, dict] = OrderedDict()
-        self.stats = CacheStats()
-        # 线程安全：保护 OrderedDict 的复合操作
-        self._lock = threading.Lock()
+        # 条目为 (value, expire_at) 二元组，避免每个条目一个 dict 的内存与哈希开销
+        self._cache: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        # 统计计数：热路径直接自增整型属性，CacheStats 仅在读取统计时按需构建
+        self._hits = self._misses = self._sets = self._deletes = 0
+        # 线程安全：分段锁保护单个 key 上的复合操作（查找 + 过期判断 + 移动/淘汰）
+        self._locks = tuple(threading.Lock() for _ in range(_LOCK_STRIPES))
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        """返回 key 所属分段的锁。"""
+        return self._locks[hash(key) & (_LOCK_STRIPES - 1)]
+
+    @contextmanager
+    def _all_locks(self):
+        """按固定顺序获取全部分段锁（用于 clear / cleanup 等全表操作，避免死锁）。"""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
 
     def get(self, key: str) -> Optional[Any]:
         """
@@ -51,25 +78,29 @@ class MemoryCache(BaseCache):
         Returns:
             Cached value if exists and not expired, None otherwise
         """
-        with self._lock:
-            if key not in self._cache:
-                self.stats.record_miss()
+        with self._lock_for(key):
+            entry = self._cache.get(key, _MISSING)
+            if entry is _MISSING:
+                self._misses += 1
                 return None
 
-            entry = self._cache[key]
-            current_time = time.time()
+            value, expire_at = entry
 
             # Check if expired
-            if current_time > entry["expire_at"]:
+            if _now() > expire_at:
                 self._delete_unlocked(key)
-                self.stats.record_miss()
+                self._misses += 1
                 return None
 
             # Move to end (mark as recently used)
-            self._cache.move_to_end(key)
-            self.stats.record_hit()
+            try:
+                self._cache.move_to_end(key)
+            except KeyError:
+                # 其他分段的 set 恰好将其淘汰，值仍然有效，直接返回
+                pass
+            self._hits += 1
 
-            return entry["value"]
+            return value
 
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         """
@@ -83,34 +114,32 @@ class MemoryCache(BaseCache):
         if ttl is None:
             ttl = self.default_ttl
 
-        current_time = time.time()
-        entry = {
-            "value": value,
-            "created_at": current_time,
-            "expire_at": current_time + ttl,
-        }
+        entry = (value, _now() + ttl)
 
-        with self._lock:
-            # Update existing key or add new
-            if key in self._cache:
-                self._cache[key] = entry
-                self._cache.move_to_end(key)
-            else:
+        with self._lock_for(key):
+            # 先弹出旧条目再插入，更新已有键时自然移到末尾（最近使用）
+            if self._cache.pop(key, _MISSING) is _MISSING:
                 # Evict oldest item if at capacity
+                # 注：并发写入不同分段时容量可能短暂超出 max_size 少许，下次写入即回落
                 if len(self._cache) >= self.max_size:
-                    oldest_key = next(iter(self._cache))
-                    self._delete_unlocked(oldest_key)
-                    logger.debug(f"Memory cache: Evicted oldest key: {oldest_key[:16]}...")
+                    try:
+                        # popitem(last=False) 为 O(1) 弹出最久未使用项
+                        oldest_key, _ = self._cache.popitem(last=False)
+                    except KeyError:
+                        # 其他线程已清空缓存
+                        pass
+                    else:
+                        self._deletes += 1
+                        logger.debug(f"Memory cache: Evicted oldest key: {oldest_key[:16]}...")
 
-                self._cache[key] = entry
+            self._cache[key] = entry
 
-            self.stats.record_set()
+            self._sets += 1
 
     def _delete_unlocked(self, key: str) -> bool:
         """删除键（不加锁，供内部使用）。"""
-        if key in self._cache:
-            del self._cache[key]
-            self.stats.record_delete()
+        if self._cache.pop(key, _MISSING) is not _MISSING:
+            self._deletes += 1
             return True
         return False
 
@@ -124,7 +153,7 @@ class MemoryCache(BaseCache):
         Returns:
             True if key was deleted, False if key didn't exist
         """
-        with self._lock:
+        with self._lock_for(key):
             return self._delete_unlocked(key)
 
     def clear(self) -> int:
@@ -134,7 +163,7 @@ class MemoryCache(BaseCache):
         Returns:
             Number of items cleared
         """
-        with self._lock:
+        with self._all_locks():
             count = len(self._cache)
             self._cache.clear()
             logger.info(f"Memory cache: Cleared {count} items")
@@ -150,15 +179,13 @@ class MemoryCache(BaseCache):
         Returns:
             True if key exists and not expired, False otherwise
         """
-        with self._lock:
-            if key not in self._cache:
+        with self._lock_for(key):
+            entry = self._cache.get(key, _MISSING)
+            if entry is _MISSING:
                 return False
 
-            entry = self._cache[key]
-            current_time = time.time()
-
             # Check if expired
-            if current_time > entry["expire_at"]:
+            if _now() > entry[1]:
                 self._delete_unlocked(key)
                 return False
 
@@ -166,31 +193,56 @@ class MemoryCache(BaseCache):
 
     def cleanup_expired(self) -> int:
         """
-        Remove all expired entries.
+        Remove expired entries from the LRU head.
+
+        默认 TTL 固定时，OrderedDict 头部即最早写入/最久未用的条目，
+        从头部逐个弹出直到遇到未过期项即可，复杂度 O(k)（k 为过期条目数）。
+        队列中部残留的过期条目会在 get/exists 时惰性删除。
 
         Returns:
             Number of entries removed
         """
-        with self._lock:
-            current_time = time.time()
-            expired_keys = [
-                key
-                for key, entry in self._cache.items()
-                if current_time > entry["expire_at"]
-            ]
-
-            for key in expired_keys:
-                self._delete_unlocked(key)
-
-            if expired_keys:
-                logger.debug(f"Memory cache: Cleaned up {len(expired_keys)} expired items")
-
-            return len(expired_keys)
+        with self._all_locks():
+            current_time = _now()
+            removed = 0
+            while self._cache:
+                _, (_, expire_at) = next(iter(self._cache.items()))
+                if current_time <= expire_at:
+                    break
+                self._cache.popitem(last=False)
+                self._deletes += 1
+                removed += 1
+
+            if removed:
+                logger.debug(f"Memory cache: Cleaned up {removed} expired items")
+
+            return removed
+
+    @property
+    def stats(self) -> CacheStats:
+        """当前统计计数的 CacheStats 快照。"""
+        snapshot = CacheStats()
+        snapshot.hits = self._hits
+        snapshot.misses = self._misses
+        snapshot.sets = self._sets
+        snapshot.deletes = self._deletes
+        return snapshot
 
     def get_stats(self) -> dict:
-        """Get cache statistics."""
+        """
+        Get cache statistics.
+
+        无锁读取：GIL 下 len(OrderedDict) 与整型属性读取均为原子操作，
+        高频指标采集不会阻塞 get/set。计数在并发下为近似值。
+        """
+        hits, misses = self._hits, self._misses
+        total = hits + misses
         return {
-            **self.stats.to_dict(),
+            "hits": hits,
+            "misses": misses,
+            "sets": self._sets,
+            "deletes": self._deletes,
+            "hit_rate": round(hits / total * 100, 2) if total else 0.0,
             "size": len(self._cache),
             "max_size": self.max_size,
         }
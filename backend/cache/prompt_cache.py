@@ -3,8 +3,10 @@ Prompt cache for System Prompt concatenation results.
 """
 
 import hashlib
-import json
 import logging
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from pathlib import Path
 
@@ -12,14 +14,31 @@ from .memory_cache import MemoryCache
 from .disk_cache import DiskCache
 from config import settings
 
+try:
+    import xxhash
+except ImportError:  # 未安装 xxhash 时回退到标准库 SHA256
+    xxhash = None
+
 logger = logging.getLogger(__name__)
 
+_pack_version = struct.Struct("<qq").pack
+
+# L2 磁盘写入后台线程：单 worker 保证写入顺序、避免磁盘争用
+_l2_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prompt-cache-l2")
+
+
+def _new_hasher():
+    """创建非加密用途的流式哈希器（仅作缓存键，优先使用 xxh3_128）。"""
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.sha256()
+
 
 class PromptCache:
     """
     Two-tier cache for System Prompt concatenation results.
 
-    Cache key is based on workspace file modification times,
+    Cache key is based on workspace file versions (mtime_ns + size),
     so cache automatically invalidates when files change.
     """
 
@@ -35,13 +54,16 @@ class PromptCache:
             default_ttl=settings.prompt_cache_ttl,
             max_size_mb=settings.cache_max_disk_size_mb,
         )
+        # 缓存键记忆 (mtime_tuple, cache_key)：文件版本未变时直接复用上次计算的哈希
+        # 作为单个元组整体替换，避免多线程下两个字段不一致
+        self._key_memo: Optional[tuple[tuple, str]] = None
 
     def _get_workspace_files_version(self) -> dict:
         """
         Get version info for all workspace files.
 
         Returns:
-            Dict mapping file paths to modification times
+            Dict mapping file paths to (mtime_ns, size)
         """
         files_version = {}
 
@@ -51,39 +73,45 @@ class PromptCache:
                 settings.workspace_dir / "IDENTITY.md",
                 settings.workspace_dir / "USER.md",
                 settings.workspace_dir / "AGENTS.md",
+                # 监听 memory.json（v2 记忆系统的核心文件）
+                settings.memory_dir / "memory.json",
             ]
 
-            # 监听 memory.json（v2 记忆系统的核心文件）
-            memory_json = settings.memory_dir / "memory.json"
-            if memory_json.exists():
-                workspace_files.append(memory_json)
-
             # 监听每日日志文件（.json 格式）用于缓存失效
             from datetime import datetime, timedelta
             logs_dir = settings.memory_dir / "logs"
-            if logs_dir.exists():
-                today = datetime.now()
-                for i in range(settings.memory_daily_log_days):
-                    day = (today - timedelta(days=i)).strftime("%Y-%m-%d")
-                    log_file = logs_dir / f"{day}.json"
-                    if log_file.exists():
-                        workspace_files.append(log_file)
-
-            # 监控 skills 目录变化（新增/删除/修改 skill）
-            skills_dir = settings.skills_dir
-            if skills_dir.exists():
-                # 记录 skills 目录本身的 mtime（新增/删除子目录会改变）
-                files_version[str(skills_dir)] = skills_dir.stat().st_mtime
-                # 记录每个 SKILL.md 文件的 mtime
-                for skill_subdir in skills_dir.iterdir():
-                    if skill_subdir.is_dir():
-                        skill_md = skill_subdir / "SKILL.md"
-                        if skill_md.exists():
-                            workspace_files.append(skill_md)
-
+            today = datetime.now()
+            for i in range(settings.memory_daily_log_days):
+                day = (today - timedelta(days=i)).strftime("%Y-%m-%d")
+                workspace_files.append(logs_dir / f"{day}.json")
+
+            # 监控 skills 目录变化（新增/删除/修改 skill），与 SKILLS_SNAPSHOT 的扫描范围一致
+            try:
+                from prompt_builder import get_skills_dirs
+                skills_dirs = get_skills_dirs()
+            except Exception:
+                skills_dirs = [settings.skills_dir]
+            for skills_dir in skills_dirs:
+                try:
+                    # 记录 skills 目录本身的版本（新增/删除子目录会改变）
+                    st = os.stat(skills_dir)
+                    files_version[str(skills_dir)] = (st.st_mtime_ns, st.st_size)
+                    # scandir 的 DirEntry 复用 getdents 返回的类型信息，无需逐项 stat
+                    with os.scandir(skills_dir) as it:
+                        for entry in it:
+                            if entry.is_dir():
+                                workspace_files.append(Path(entry.path) / "SKILL.md")
+                except OSError:
+                    pass
+
+            # 每个文件仅一次 stat：不存在则跳过，省去 exists() 预检查
+            # 使用整数 mtime_ns + size：避免浮点 mtime 精度丢失，同一时间戳内的改写也能通过大小识别
             for file_path in workspace_files:
-                if file_path.exists():
-                    files_version[str(file_path)] = file_path.stat().st_mtime
+                try:
+                    st = os.stat(file_path)
+                    files_version[str(file_path)] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    pass
 
         except Exception as e:
             logger.warning(f"Failed to get workspace files version: {e}")
@@ -95,23 +123,55 @@ class PromptCache:
         Compute cache key based on workspace file versions.
 
         Returns:
-            SHA256 hash of file versions
+            Hash of file versions (xxh3_128, falls back to SHA256)
         """
         files_version = self._get_workspace_files_version()
-        version_str = json.dumps(files_version, sort_keys=True)
-        return hashlib.sha256(version_str.encode("utf-8")).hexdigest()
 
-    def get_cached_prompt(self) -> Optional[str]:
+        # 文件 mtime 未变化时跳过 JSON 序列化与哈希计算
+        mtime_tuple = tuple(sorted(files_version.items()))
+        memo = self._key_memo
+        if memo is not None and memo[0] == mtime_tuple:
+            return memo[1]
+
+        # 直接把路径与 (mtime_ns, size) 原始字节喂入哈希器，省去 JSON 序列化与中间字符串
+        h = _new_hasher()
+        for path_str, (mtime_ns, size) in mtime_tuple:
+            h.update(path_str.encode("utf-8"))
+            h.update(b"\x00")
+            h.update(_pack_version(mtime_ns, size))
+        cache_key = h.hexdigest()
+        self._key_memo = (mtime_tuple, cache_key)
+        return cache_key
+
+    def get_cache_key(self) -> Optional[str]:
+        """
+        Compute the cache key for the current workspace file versions.
+
+        调用方在构建前取一次键，并原样传给 get_cached_prompt / cache_prompt：
+        并发请求各自持有自己的键，构建期间文件变化也不会把结果写到新版本的键下。
+
+        Returns:
+            Cache key, or None if prompt cache is disabled
+        """
+        if not settings.enable_prompt_cache:
+            return None
+        return self._compute_cache_key()
+
+    def get_cached_prompt(self, cache_key: Optional[str] = None) -> Optional[str]:
         """
         Get cached System Prompt.
 
+        Args:
+            cache_key: Key from get_cache_key (None = compute now)
+
         Returns:
             Cached prompt if exists, None otherwise
         """
         if not settings.enable_prompt_cache:
             return None
 
-        cache_key = self._compute_cache_key()
+        if cache_key is None:
+            cache_key = self._compute_cache_key()
 
         # Try L1 first
         cached = self.l1.get(cache_key)
@@ -130,24 +190,34 @@ class PromptCache:
         logger.debug("Prompt cache miss")
         return None
 
-    def cache_prompt(self, prompt: str) -> None:
+    def cache_prompt(self, prompt: str, cache_key: Optional[str] = None) -> None:
         """
         Cache System Prompt.
 
         Args:
             prompt: System prompt to cache
+            cache_key: Key from get_cache_key taken before the prompt was
+                built (None = compute now)
         """
         if not settings.enable_prompt_cache:
             return
 
-        cache_key = self._compute_cache_key()
+        if cache_key is None:
+            cache_key = self._compute_cache_key()
 
-        # Store in both L1 and L2
+        # L1 同步写入，后续读取立即命中；L2 仅作持久化，放到后台线程避免阻塞请求
         self.l1.set(cache_key, prompt)
-        self.l2.set(cache_key, prompt)
+        _l2_pool.submit(self._write_l2, cache_key, prompt)
 
         logger.debug("System prompt cached")
 
+    def _write_l2(self, cache_key: str, prompt: str) -> None:
+        """后台写入 L2（异常仅记录日志，不影响请求）。"""
+        try:
+            self.l2.set(cache_key, prompt)
+        except Exception as e:
+            logger.warning(f"Prompt cache L2 write failed: {e}")
+
     def clear(self) -> dict:
         """
         Clear all Prompt cache.
@@ -0,0 +1,318 @@
+"""
+Semantic cache for Agent responses.
+
+Sits in front of the exact-match LLM cache: paraphrased questions within the
+same conversation context reuse a previous answer when their embeddings are
+close enough (cosine similarity above the configured threshold).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, AsyncGenerator, Callable
+
+try:
+    import numpy as np
+except ImportError:  # 未安装 numpy 时回退到纯 Python 余弦计算
+    np = None
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 可安全缓存的事件类型：只包含纯文本回复，出现工具调用/计划/审批等事件的轮次不缓存
+_CACHEABLE_EVENT_TYPES = frozenset({"token", "llm_start", "llm_end", "phase", "done"})
+
+# 回放时每个 token 事件包含的字符数
+_REPLAY_CHUNK_CHARS = 20
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize_message(message: str) -> str:
+    """归一化用户消息：去首尾空白、折叠连续空白、小写。"""
+    return _WHITESPACE_RE.sub(" ", message.strip()).lower()
+
+
+def _unit_vector(vec: list[float]) -> Optional[list[float]]:
+    """将向量归一化为单位向量，零向量返回 None。"""
+    norm = math.sqrt(sum(v * v for v in vec))
+    if norm == 0:
+        return None
+    return [v / norm for v in vec]
+
+
+class _ContextBucket:
+    """同一上下文（系统提示 + 最近历史 + 模型参数）下的语义缓存条目。"""
+
+    __slots__ = ("entries", "matrix")
+
+    def __init__(self):
+        # key: 归一化消息 → (单位向量, 回复文本, 过期时间)
+        self.entries: "OrderedDict[str, tuple[list[float], str, float]]" = OrderedDict()
+        # numpy 矩阵缓存（条目变化后置为 None，下次查询时重建）
+        self.matrix = None
+
+
+class SemanticCache:
+    """
+    In-memory semantic cache for Agent text responses.
+
+    Entries are scoped by a context key (system prompt hash, recent history,
+    model parameters, memory fingerprint) so a hit never crosses conversation
+    state. Only turns that produced plain text (no tool calls, plans or
+    approvals) are stored; hits are replayed as token events.
+    """
+
+    def __init__(self):
+        """Initialize semantic cache."""
+        self._buckets: "OrderedDict[str, _ContextBucket]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._client = None
+        self._client_cfg: Optional[tuple] = None
+        self._hits = 0
+        self._misses = 0
+
+    def _compute_context_key(self, key_params: Dict[str, Any]) -> str:
+        """
+        Compute context key (everything except the current message).
+
+        Args:
+            key_params: Same dict as LLMCache key params
+
+        Returns:
+            SHA256 hash of the context parameters
+        """
+        system_prompt = key_params.get("system_prompt", "")
+        key_structure = {
+            "system_prompt_hash": hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16],
+            "recent_history": key_params.get("recent_history", []),
+            "model": key_params.get("model", ""),
+            "temperature": key_params.get("temperature", 0.7),
+            "memory_fingerprint": key_params.get("memory_fingerprint", ""),
+        }
+        key_str = json.dumps(key_structure, sort_keys=True)
+        return hashlib.sha256(key_str.encode("utf-8")).hexdigest()
+
+    def _get_client(self):
+        """获取 embedding 客户端（配置变化时重建），配置不完整返回 None。"""
+        from model_pool import resolve_model
+
+        emb_cfg = resolve_model("embedding")
+        if not emb_cfg or not emb_cfg.get("api_key") or not emb_cfg.get("model"):
+            return None, ""
+        cfg = (emb_cfg["api_key"], emb_cfg["api_base"])
+        if self._client is None or self._client_cfg != cfg:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=cfg[0], base_url=cfg[1], timeout=30)
+            self._client_cfg = cfg
+        return self._client, emb_cfg["model"]
+
+    def _embed(self, text: str) -> Optional[list[float]]:
+        """同步获取单位 embedding 向量，失败返回 None（调用方退化为直通）。"""
+        try:
+            client, model = self._get_client()
+            if client is None:
+                return None
+            response = client.embeddings.create(model=model, input=text)
+            return _unit_vector(response.data[0].embedding)
+        except Exception as e:
+            logger.debug(f"Semantic cache embedding failed: {e}")
+            return None
+
+    def _lookup(self, context_key: str, vector: list[float]) -> Optional[str]:
+        """在上下文桶内查找相似度最高且超过阈值的回复。"""
+        threshold = settings.semantic_cache_threshold
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(context_key)
+            if bucket is None or not bucket.entries:
+                return None
+
+            # 清理过期条目
+            expired = [k for k, (_, _, exp) in bucket.entries.items() if exp <= now]
+            for k in expired:
+                del bucket.entries[k]
+            if expired:
+                self._size -= len(expired)
+                bucket.matrix = None
+            if not bucket.entries:
+                return None
+
+            keys = list(bucket.entries)
+            if np is not None:
+                if bucket.matrix is None:
+                    bucket.matrix = np.asarray([e[0] for e in bucket.entries.values()], dtype=np.float32)
+                scores = bucket.matrix @ np.asarray(vector, dtype=np.float32)
+                best = int(scores.argmax())
+                best_score = float(scores[best])
+            else:
+                best, best_score = -1, -1.0
+                for i, (vec, _, _) in enumerate(bucket.entries.values()):
+                    score = sum(a * b for a, b in zip(vec, vector))
+                    if score > best_score:
+                        best, best_score = i, score
+
+            if best_score < threshold:
+                return None
+
+            key = keys[best]
+            self._buckets.move_to_end(context_key)
+            bucket.entries.move_to_end(key)
+            bucket.matrix = None
+            logger.info(f"✓ Semantic cache hit (score={best_score:.3f})")
+            return bucket.entries[key][1]
+
+    def _store(self, context_key: str, message_key: str, vector: list[float], response: str) -> None:
+        """写入条目，超过容量时按 LRU 淘汰最久未使用的条目。"""
+        expire_at = time.monotonic() + settings.semantic_cache_ttl
+        with self._lock:
+            bucket = self._buckets.get(context_key)
+            if bucket is None:
+                bucket = self._buckets[context_key] = _ContextBucket()
+            if message_key not in bucket.entries:
+                self._size += 1
+            bucket.entries[message_key] = (vector, response, expire_at)
+            bucket.entries.move_to_end(message_key)
+            bucket.matrix = None
+            self._buckets.move_to_end(context_key)
+
+            max_items = settings.semantic_cache_max_items
+            while self._size > max_items and self._buckets:
+                oldest_ctx, oldest_bucket = next(iter(self._buckets.items()))
+                if oldest_bucket.entries:
+                    oldest_bucket.entries.popitem(last=False)
+                    oldest_bucket.matrix = None
+                    self._size -= 1
+                if not oldest_bucket.entries:
+                    del self._buckets[oldest_ctx]
+
+    async def get_or_generate(
+        self,
+        key_params: Dict[str, Any],
+        generator_func: Callable[[], AsyncGenerator],
+        stream: bool = True,
+    ) -> AsyncGenerator:
+        """
+        Replay a semantically similar cached response or generate a new one.
+
+        Args:
+            key_params: Parameters for cache key computation (includes current_message)
+            generator_func: Async generator function to call if cache miss
+            stream: Whether to simulate streaming output
+
+        Yields:
+            Event dicts from cache or generator
+        """
+        if not settings.enable_semantic_cache:
+            async for event in generator_func():
+                yield event
+            return
+
+        message_key = _normalize_message(key_params.get("current_message", ""))
+        context_key = self._compute_context_key(key_params)
+        # embedding 为同步网络调用，放到线程中避免阻塞事件循环
+        vector = await asyncio.to_thread(self._embed, message_key) if message_key else None
+
+        if vector is not None:
+            cached = self._lookup(context_key, vector)
+            if cached is not None:
+                self._hits += 1
+                async for event in self._replay(cached, stream):
+                    yield event
+                return
+        self._misses += 1
+
+        collected = []
+        cacheable = vector is not None
+        async for event in generator_func():
+            if cacheable:
+                event_type = event.get("type")
+                if event_type not in _CACHEABLE_EVENT_TYPES or (
+                    event_type == "llm_end" and event.get("tool_calls")
+                ):
+                    cacheable = False
+                elif event_type == "token":
+                    collected.append(event.get("content", ""))
+            yield event
+
+        if cacheable and collected:
+            self._store(context_key, message_key, vector, "".join(collected))
+
+    async def _replay(self, response: str, stream: bool) -> AsyncGenerator:
+        """将缓存的回复切分为 token 事件回放，最后发送 done。"""
+        from engine import events
+
+        if stream:
+            for i in range(0, len(response), _REPLAY_CHUNK_CHARS):
+                event = events.build_token(response[i:i + _REPLAY_CHUNK_CHARS])
+                event["cached"] = True
+                yield event
+                await asyncio.sleep(0.01)
+        else:
+            event = events.build_token(response)
+            event["cached"] = True
+            yield event
+        yield events.build_done()
+
+    def clear(self) -> dict:
+        """
+        Clear all semantic cache entries.
+
+        Returns:
+            Dict with clear counts
+        """
+        with self._lock:
+            count = self._size
+            self._buckets.clear()
+            self._size = 0
+        return {"l1_cleared": count}
+
+    def cleanup_expired(self) -> int:
+        """
+        Remove expired entries from all context buckets.
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            for ctx_key in list(self._buckets):
+                bucket = self._buckets[ctx_key]
+                expired = [k for k, (_, _, exp) in bucket.entries.items() if exp <= now]
+                for k in expired:
+                    del bucket.entries[k]
+                if expired:
+                    removed += len(expired)
+                    bucket.matrix = None
+                if not bucket.entries:
+                    del self._buckets[ctx_key]
+            self._size -= removed
+        return removed
+
+    def get_stats(self) -> dict:
+        """Get semantic cache statistics (same shape as the two-tier caches)."""
+        hits, misses = self._hits, self._misses
+        total = hits + misses
+        return {
+            "enabled": settings.enable_semantic_cache,
+            "ttl": settings.semantic_cache_ttl,
+            "threshold": settings.semantic_cache_threshold,
+            "l1": {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / total * 100, 2) if total else 0.0,
+                "size": self._size,
+                "max_size": settings.semantic_cache_max_items,
+            },
+            # 纯内存缓存，无磁盘层：保留与其他缓存一致的结构
+            "l2": {"hits": 0, "misses": 0, "hit_rate": 0, "size_mb": 0, "file_count": 0},
+        }
@@ -109,16 +109,23 @@ class Settings(BaseSettings):
     # Agent execution limits
     agent_recursion_limit: int = 100
 
+    # SSE 输出：连续 token 事件在该时间窗口（毫秒）内合并为一帧发送，0 表示逐 token 发送
+    sse_coalesce_ms: int = Field(default=10)
+
     # Cache Configuration
     enable_url_cache: bool = Field(default=True)
     enable_llm_cache: bool = Field(default=False)
     enable_prompt_cache: bool = Field(default=True)
     enable_translate_cache: bool = Field(default=True)
+    enable_semantic_cache: bool = Field(default=False)
 
     url_cache_ttl: int = Field(default=3600)
     llm_cache_ttl: int = Field(default=86400)
     prompt_cache_ttl: int = Field(default=600)
     translate_cache_ttl: int = Field(default=604800)
+    semantic_cache_ttl: int = Field(default=86400)
+    semantic_cache_threshold: float = Field(default=0.95, description="语义缓存命中所需的最小余弦相似度")
+    semantic_cache_max_items: int = Field(default=10000)
 
     cache_max_memory_items: int = Field(default=100)
     cache_max_disk_size_mb: int = Field(default=5120)
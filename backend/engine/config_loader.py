@@ -34,6 +34,8 @@ _DEFAULTS: dict[str, Any] = {
             "replanner": {
                 "enabled": True,
                 "skip_on_success": True,
+                "speculative": False,
+                "every_n_steps": 1,
             },
             "summarizer": {
                 "enabled": True,
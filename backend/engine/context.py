@@ -20,6 +20,8 @@ class RunContext:
     # 由 runner 在执行前设置
     message: str = ""
     session_history: list = field(default_factory=list)
+    # 单次请求内复用的系统提示词（未替换占位符），避免重复读取工作区文件
+    system_prompt: Optional[str] = None
 
     # 审批通道（security gate + plan approval 共用）
     approval_queue: asyncio.Queue = field(default_factory=asyncio.Queue)
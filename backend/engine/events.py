@@ -6,10 +6,36 @@
 import json
 import logging
 import time
-from typing import Optional
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时回退到标准库 json
+    orjson = None
+
+from model_pool import resolve_model_name
 
 logger = logging.getLogger(__name__)
 
+# 只读空映射哨兵：替代 `x or {}` / `.get(k, {})`，避免每个事件都新建空 dict
+EMPTY = MappingProxyType({})
+
+
+def _json_dumps(obj, indent: bool = False) -> str:
+    """JSON 序列化（非 ASCII 原样输出）。优先 orjson，其不支持的对象回退到标准库 json。"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
+
+
+def _truncate(s: str, n: int) -> str:
+    """截断到 n 个字符（超出时追加省略号）；未超长时原样返回，不产生新字符串。"""
+    return s if len(s) <= n else s[:n] + "…"
+
 
 def estimate_tokens(text: str) -> int:
     """估算文本的 token 数（经验公式，适用于大多数模型）。
@@ -23,9 +49,18 @@ def estimate_tokens(text: str) -> int:
     """
     if not text:
         return 0
-    # 统计中文字符数
-    chinese_count = sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
-    other_count = len(text) - chinese_count
+    return estimate_tokens_parts((text,))
+
+
+def estimate_tokens_parts(parts) -> int:
+    """估算多段文本拼接后的 token 数（结果与 estimate_tokens("".join(parts)) 一致，但无需拼接）。"""
+    chinese_count = 0
+    total = 0
+    for text in parts:
+        # 统计中文字符数
+        chinese_count += sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
+        total += len(text)
+    other_count = total - chinese_count
     # 中文约 1.5 字符/token，其他约 4 字符/token
     return int(chinese_count / 1.5 + other_count / 4)
 
@@ -43,8 +78,8 @@ PLAN_REVISED = "plan_revised"
 PLAN_APPROVAL_REQUEST = "plan_approval_request"
 PHASE = "phase"
 
-# 工具动机映射（中文显示名）
-TOOL_MOTIVATIONS = {
+# 工具动机映射（中文显示名，只读常量）
+TOOL_MOTIVATIONS: Mapping[str, str] = MappingProxyType({
     "read_file": "读取文件内容",
     "write_file": "写入文件",
     "terminal": "执行终端命令",
@@ -54,7 +89,7 @@ TOOL_MOTIVATIONS = {
     "memory_write": "写入记忆",
     "fetch_url": "获取网页内容",
     "plan_create": "创建任务计划",
-}
+})
 
 
 def build_phase(phase_name: str, description: str, **extra) -> dict:
@@ -76,7 +111,7 @@ def build_token(content: str) -> dict:
 
 def build_tool_start(tool_name: str, tool_input, motivation: str = None) -> dict:
     if motivation is None:
-        motivation = TOOL_MOTIVATIONS.get(tool_name, f"调用工具：{tool_name}")
+        motivation = TOOL_MOTIVATIONS.get(tool_name) or f"调用工具：{tool_name}"
     return {
         "type": TOOL_START,
         "tool": tool_name,
@@ -146,21 +181,21 @@ def build_plan_approval_request(plan_info: dict) -> dict:
 def build_tool_start_from_raw(event: dict) -> dict:
     """从 LangGraph on_tool_start 事件构建 tool_start。"""
     tool_name = event.get("name", "")
-    tool_input = (event.get("data") or {}).get("input", {})
+    tool_input = (event.get("data") or EMPTY).get("input", {})
     return build_tool_start(tool_name, tool_input)
 
 
 def build_tool_end_from_raw(event: dict, duration_ms: Optional[int] = None) -> dict:
     """从 LangGraph on_tool_end 事件构建 tool_end。"""
     tool_name = event.get("name", "")
-    tool_output = (event.get("data") or {}).get("output", "")
+    tool_output = (event.get("data") or EMPTY).get("output", "")
 
     if hasattr(tool_output, 'content'):
         output_str = str(tool_output.content)
     else:
         output_str = str(tool_output)
 
-    output_str = output_str[:2000]
+    output_str = _truncate(output_str, 2000)
 
     # 检测 [DOCKER] 前缀，标记执行环境
     sandbox = "local"
@@ -176,11 +211,71 @@ def build_tool_end_from_raw(event: dict, duration_ms: Optional[int] = None) -> d
     return build_tool_end(tool_name, output_str, is_cached, duration_ms, sandbox)
 
 
-def build_llm_end_from_raw(event: dict, tracked: dict) -> dict:
-    """从 LangGraph on_chat_model_end 事件 + 追踪数据构建 llm_end。"""
+class TrackedCall:
+    """进行中的 LLM / 工具调用追踪数据（__slots__，避免每条目一个 dict）。
+
+    node：LLM 调用为所属节点名，工具调用为工具名。
+    input_tokens：完整输入的 token 估算值（input 仅为展示用的精简文本时必须提供）；
+    None 表示直接按 input 估算。
+    """
+
+    __slots__ = ("start_time", "node", "input", "input_tokens")
+
+    def __init__(self, start_time: float, node: str, input: str = "",
+                 input_tokens: Optional[int] = None):
+        self.start_time = start_time
+        self.node = node
+        self.input = input
+        self.input_tokens = input_tokens
+
+
+def _extract_llm_output(output_msg) -> tuple[str, list]:
+    """一次遍历提取 LLM 输出消息的文本内容与原始工具调用列表。"""
+    content = getattr(output_msg, "content", None)
+    if isinstance(content, list):
+        content_str = " ".join(
+            (item["text"] if "text" in item else str(item)) if isinstance(item, dict) else str(item)
+            for item in content
+        )
+    else:
+        content_str = str(content) if content else ""
+    return content_str, getattr(output_msg, "tool_calls", None) or []
+
+
+def _normalize_tool_call(tc) -> dict:
+    """将单个工具调用统一为 {name, arguments}（支持字典和对象两种格式）。"""
+    if isinstance(tc, dict):
+        name = tc.get("name", "unknown")
+        args = tc["args"] if "args" in tc else tc.get("arguments", "")
+    else:
+        # 对象格式：优先取 name/args，仅在缺失时才回退到 function.name/function.arguments
+        name = getattr(tc, "name", None)
+        args = getattr(tc, "args", None) or getattr(tc, "arguments", None)
+        if name is None or args is None:
+            func = getattr(tc, "function", None)
+            if func is not None:
+                is_dict = isinstance(func, dict)
+                if name is None:
+                    name = func.get("name") if is_dict else getattr(func, "name", "unknown")
+                if args is None:
+                    args = func.get("arguments") if is_dict else getattr(func, "arguments", "")
+        name = name or "unknown"
+        args = args or ""
+
+    return {
+        "name": name,
+        "arguments": json.dumps(args, ensure_ascii=False) if isinstance(args, dict) else str(args),
+    }
+
+
+def build_llm_end_from_raw(event: dict, tracked: TrackedCall, debug: bool = True) -> dict:
+    """从 LangGraph on_chat_model_end 事件 + 追踪数据构建 llm_end。
+
+    debug=False 时工具调用只输出数量，不做 JSON 序列化。
+    """
     run_id = event.get("run_id", "")
-    output_msg = (event.get("data") or {}).get("output", None)
-    duration_ms = int((time.time() - tracked["start_time"]) * 1000)
+    output_msg = (event.get("data") or EMPTY).get("output", None)
+    duration_ms = int((time.time() - tracked.start_time) * 1000)
 
     # 提取 Token 用量（优先使用 API 返回的真实值，否则使用估算值）
     tokens = {}
@@ -196,62 +291,31 @@ def build_llm_end_from_raw(event: dict, tracked: dict) -> dict:
     # 提取输出文本
     output_parts = []
     if output_msg:
-        if hasattr(output_msg, "content"):
-            content = output_msg.content
-            if isinstance(content, list):
-                content_str = " ".join(
-                    item.get("text", str(item)) if isinstance(item, dict) else str(item)
-                    for item in content
-                )
+        content_str, raw_tool_calls = _extract_llm_output(output_msg)
+        if content_str.strip():
+            output_parts.append(content_str)
+
+        if raw_tool_calls:
+            if debug:
+                tool_calls = [_normalize_tool_call(tc) for tc in raw_tool_calls]
+                output_parts.append("[TOOL_CALLS]: " + _json_dumps(tool_calls, indent=True))
             else:
-                content_str = str(content) if content else ""
-            if content_str.strip():
-                output_parts.append(content_str)
-
-        tool_calls = []
-        if hasattr(output_msg, "tool_calls") and output_msg.tool_calls:
-            for tc in output_msg.tool_calls:
-                # 支持字典和对象两种格式（不同 LLM 返回格式可能不同）
-                if isinstance(tc, dict):
-                    name = tc.get("name", "unknown")
-                    args = tc.get("args", tc.get("arguments", ""))
-                else:
-                    # 对象格式：优先取 name/args，其次取 function.name/function.arguments
-                    name = getattr(tc, "name", None)
-                    if name is None and hasattr(tc, "function"):
-                        func = tc.function
-                        name = func.get("name") if isinstance(func, dict) else getattr(func, "name", "unknown")
-                    name = name or "unknown"
-
-                    args = getattr(tc, "args", None) or getattr(tc, "arguments", None)
-                    if args is None and hasattr(tc, "function"):
-                        func = tc.function
-                        args = func.get("arguments") if isinstance(func, dict) else getattr(func, "arguments", "")
-                    args = args or ""
-
-                tc_info = {
-                    "name": name,
-                    "arguments": json.dumps(args, ensure_ascii=False) if isinstance(args, dict) else str(args),
-                }
-                tool_calls.append(tc_info)
-
-        if tool_calls:
-            output_parts.append("[TOOL_CALLS]: " + json.dumps(tool_calls, ensure_ascii=False, indent=2))
-
-        if not output_parts and hasattr(output_msg, "additional_kwargs") and output_msg.additional_kwargs:
-            output_parts.append(str(output_msg.additional_kwargs))
+                output_parts.append(f"[TOOL_CALLS]: {len(raw_tool_calls)}")
 
         if not output_parts:
-            output_parts.append(str(output_msg))
+            additional_kwargs = getattr(output_msg, "additional_kwargs", None)
+            output_parts.append(str(additional_kwargs) if additional_kwargs else str(output_msg))
 
     output_text = "\n\n".join(output_parts) if output_parts else "(无内容)"
 
     # 如果 API 没有返回 token 信息，使用估算值
     # 流式输出时 usage_metadata 通常为空，因此需要本地估算
-    input_text = tracked["input"]
+    input_text = tracked.input
     if not tokens.get("total_tokens"):
         tokens_estimated = True
-        est_input = estimate_tokens(input_text)
+        est_input = tracked.input_tokens
+        if est_input is None:
+            est_input = estimate_tokens(input_text)
         est_output = estimate_tokens(output_text)
         tokens = {
             "input_tokens": est_input,
@@ -259,12 +323,11 @@ def build_llm_end_from_raw(event: dict, tracked: dict) -> dict:
             "total_tokens": est_input + est_output,
         }
 
-    from model_pool import resolve_model
-    model_name = resolve_model("llm").get("model", "unknown")
+    model_name = resolve_model_name("llm")
 
     result = build_llm_end(
         call_id=run_id[:12],
-        node=tracked["node"],
+        node=tracked.node,
         model=model_name,
         duration_ms=duration_ms,
         tokens=tokens,
@@ -298,4 +361,4 @@ def build_llm_end_from_raw(event: dict, tracked: dict) -> dict:
 
 def serialize_sse(event: dict) -> str:
     """将事件 dict 序列化为 SSE 格式。所有 SSE 输出的唯一入口。"""
-    return f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    return f"data: {_json_dumps(event)}\n\n"
@@ -5,18 +5,22 @@
 
 内存管理增强：
 - MemorySaver 的 checkpoint 数据会随会话增长而无限累积
-- 添加定期清理机制，限制每个 thread 最多保留的 checkpoint 数量
+- 写入 checkpoint 时即淘汰超出上限的旧数据，限制每个 thread 最多保留的 checkpoint 数量
 """
 import hashlib
-import json
 import logging
-import time
+from collections import OrderedDict, deque
 from functools import lru_cache
-from typing import Optional
+from typing import Any, Optional
 
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, StateGraph
 
+try:
+    import xxhash
+except ImportError:  # 未安装 xxhash 时回退到标准库 SHA256
+    xxhash = None
+
 from engine.config_loader import get_node_config, get_settings, load_graph_config
 from engine.edges import (
     route_after_agent,
@@ -37,74 +41,69 @@ from engine.state import AgentState
 
 logger = logging.getLogger(__name__)
 
-# 图缓存：fingerprint → 编译后的图
-_graph_cache: dict[str, tuple] = {}
+# 图缓存：fingerprint → 编译后的图（LRU，超出上限淘汰最久未用的图）
+_graph_cache: OrderedDict[str, Any] = OrderedDict()
+_GRAPH_CACHE_MAX = 8
 
-# 全局 checkpointer（用于 interrupt/resume）
-_checkpointer = MemorySaver()
+# 指纹快速路径：(上次传入的配置对象, 指纹)
+# 持有配置对象的强引用并用 `is` 比较，避免 id() 在对象回收后被复用导致误命中
+_fp_memo: Optional[tuple[dict, str]] = None
 
-# Checkpoint 清理配置
+# Checkpoint 配置
 _CHECKPOINT_MAX_PER_THREAD = 20  # 每个 thread 最多保留的 checkpoint 数量
-_CHECKPOINT_CLEANUP_INTERVAL = 300  # 清理间隔（秒）
-_last_checkpoint_cleanup = 0.0
-
 
-def cleanup_old_checkpoints() -> int:
-    """清理旧的 checkpoint 数据，防止内存无限增长。
 
-    MemorySaver 使用内部的 storage dict 存储所有 checkpoint。
-    每个 thread_id 可能有多个 checkpoint（每次节点转换都会创建）。
-    这里清理超过限制数量的旧 checkpoint。
+class _BoundedMemorySaver(MemorySaver):
+    """每个 (thread_id, checkpoint_ns) 只保留最近 N 个 checkpoint 的 MemorySaver。
 
-    Returns:
-        清理的 checkpoint 数量
+    写入时用 deque 记录 checkpoint_id，超出上限时立即删除最旧的一个，
+    摊销 O(1)，无需周期性扫描整个 storage。同时记录每个 checkpoint 的
+    channel_versions，淘汰后删除不再被任何保留 checkpoint 引用的通道值 blob。
     """
-    global _last_checkpoint_cleanup
-
-    now = time.time()
-    if now - _last_checkpoint_cleanup < _CHECKPOINT_CLEANUP_INTERVAL:
-        return 0
-
-    _last_checkpoint_cleanup = now
-    cleaned = 0
-
-    try:
-        # MemorySaver 的内部存储结构：storage = {(thread_id, checkpoint_ns, checkpoint_id): checkpoint_data}
-        # 我们需要按 thread_id 分组并保留最新的
-        storage = getattr(_checkpointer, "storage", {})
-        if not storage:
-            return 0
-
-        # 按 thread_id 分组
-        by_thread: dict[str, list[tuple]] = {}
-        for key in list(storage.keys()):
-            if isinstance(key, tuple) and len(key) >= 1:
-                thread_id = key[0]
-                by_thread.setdefault(thread_id, []).append(key)
-
-        # 对每个 thread，只保留最新的 N 个 checkpoint
-        for thread_id, keys in by_thread.items():
-            if len(keys) <= _CHECKPOINT_MAX_PER_THREAD:
-                continue
 
-            # 按 checkpoint_id 排序（通常是时间戳格式）
-            sorted_keys = sorted(keys, key=lambda k: k[2] if len(k) > 2 else "", reverse=True)
-            keys_to_remove = sorted_keys[_CHECKPOINT_MAX_PER_THREAD:]
-
-            for key in keys_to_remove:
-                try:
-                    del storage[key]
-                    cleaned += 1
-                except KeyError:
-                    pass
-
-        if cleaned > 0:
-            logger.info(f"已清理 {cleaned} 个旧 checkpoint")
-
-    except Exception as e:
-        logger.debug(f"Checkpoint 清理时出错（非致命）: {e}")
-
-    return cleaned
+    def __init__(self, *args, max_per_thread: int = _CHECKPOINT_MAX_PER_THREAD, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._max_per_thread = max_per_thread
+        self._thread_keys: dict[tuple[str, str], deque] = {}
+        # (thread_id, checkpoint_ns, checkpoint_id) → channel_versions（避免淘汰时反序列化 checkpoint）
+        self._versions: dict[tuple[str, str, str], dict] = {}
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        conf = saved["configurable"]
+        thread_id = conf["thread_id"]
+        checkpoint_ns = conf["checkpoint_ns"]
+
+        ids = self._thread_keys.get((thread_id, checkpoint_ns))
+        if ids is None:
+            ids = self._thread_keys[(thread_id, checkpoint_ns)] = deque()
+        ids.append(conf["checkpoint_id"])
+        self._versions[(thread_id, checkpoint_ns, conf["checkpoint_id"])] = dict(
+            checkpoint.get("channel_versions", {})
+        )
+
+        if len(ids) > self._max_per_thread:
+            oldest_id = ids.popleft()
+            self.storage[thread_id][checkpoint_ns].pop(oldest_id, None)
+            self.writes.pop((thread_id, checkpoint_ns, oldest_id), None)
+            evicted = self._versions.pop((thread_id, checkpoint_ns, oldest_id), {})
+            # 通道值 blob 按版本共享：仅删除所有保留 checkpoint 都不再引用的版本
+            retained = [self._versions.get((thread_id, checkpoint_ns, cid), {}) for cid in ids]
+            for channel, version in evicted.items():
+                if not any(v.get(channel) == version for v in retained):
+                    self.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+        return saved
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        for key in [k for k in self._thread_keys if k[0] == thread_id]:
+            del self._thread_keys[key]
+        for key in [k for k in self._versions if k[0] == thread_id]:
+            del self._versions[key]
+
+
+# 全局 checkpointer（用于 interrupt/resume），写入时即按数量上限淘汰旧 checkpoint
+_checkpointer = _BoundedMemorySaver()
 
 
 def build_graph(graph_config: dict):
@@ -250,24 +249,60 @@ def build_graph(graph_config: dict):
 
 def get_or_build_graph(graph_config: dict):
     """获取或构建编译后的图（带指纹缓存）。"""
-    # 定期清理旧 checkpoint，防止内存无限增长
-    cleanup_old_checkpoints()
+    global _fp_memo
+    # 同一配置对象重复传入时跳过结构哈希
+    memo = _fp_memo
+    if memo is not None and memo[0] is graph_config:
+        fp = memo[1]
+    else:
+        fp = _config_fingerprint(graph_config)
+        _fp_memo = (graph_config, fp)
+
+    compiled = _graph_cache.get(fp)
+    if compiled is not None:
+        _graph_cache.move_to_end(fp)
+        return compiled
+
+    compiled = build_graph(graph_config)
+    if len(_graph_cache) >= _GRAPH_CACHE_MAX:
+        evicted_fp, _ = _graph_cache.popitem(last=False)
+        logger.debug("图缓存已满，淘汰指纹: %s", evicted_fp)
+    _graph_cache[fp] = compiled
+    logger.debug("图已缓存，指纹: %s", fp)
+    return compiled
 
-    fp = _config_fingerprint(graph_config)
-    if fp not in _graph_cache:
-        compiled = build_graph(graph_config)
-        _graph_cache[fp] = compiled
-        logger.debug("图已缓存，指纹: %s", fp)
-    return _graph_cache[fp]
+
+def _hash_obj(h, obj) -> None:
+    """递归遍历配置结构，直接向哈希器喂入字节（无需生成中间 JSON 字符串）。"""
+    if isinstance(obj, dict):
+        h.update(b"{")
+        for k, v in sorted(obj.items(), key=lambda kv: str(kv[0])):
+            h.update(repr(k).encode())
+            h.update(b":")
+            _hash_obj(h, v)
+            h.update(b",")
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[%d:" % len(obj))
+        for item in obj:
+            _hash_obj(h, item)
+            h.update(b",")
+        h.update(b"]")
+    else:
+        # 基本类型：repr 自带类型区分（如 '1' 与 1）
+        h.update(repr(obj).encode())
 
 
 def _config_fingerprint(graph_config: dict) -> str:
-    """根据配置内容生成 SHA256 短指纹。"""
-    raw = json.dumps(graph_config, sort_keys=True)
-    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+    """根据配置内容生成 16 位十六进制短指纹（xxh3_64，未安装时回退 SHA256）。"""
+    h = xxhash.xxh3_64() if xxhash is not None else hashlib.sha256()
+    _hash_obj(h, graph_config)
+    return h.hexdigest()[:16]
 
 
 def invalidate_graph_cache() -> None:
     """清除图缓存。配置变更后应调用此函数。"""
+    global _fp_memo
+    _fp_memo = None
     _graph_cache.clear()
     logger.info("图缓存已清除")
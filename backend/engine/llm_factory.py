@@ -13,6 +13,11 @@ logger = logging.getLogger(__name__)
 
 _llm_cache: dict[str, ChatOpenAI] = {}
 
+# bind_tools 结果缓存：(id(llm), 各工具 id) → (llm, tools, bound)
+# 值中持有 llm 与工具的强引用，保证键中的 id 在条目存活期间不会被复用
+_bound_cache: dict[tuple, tuple] = {}
+_BOUND_CACHE_MAX = 8
+
 
 def _config_fingerprint(scenario: str = "llm") -> str:
     """根据当前模型配置生成短哈希，用于缓存键。"""
@@ -48,6 +53,27 @@ def get_llm(streaming: bool = True, scenario: str = "llm") -> ChatOpenAI:
     return _llm_cache[key]
 
 
+def get_llm_with_tools(tools: list, streaming: bool = True):
+    """获取绑定了工具的 LLM。
+
+    同一 LLM 实例 + 同一组工具对象时复用 bind_tools 结果，
+    避免计划的每个步骤 / 每次回到 agent 时重复转换全部工具 schema。
+    """
+    llm = get_llm(streaming=streaming)
+    if not tools:
+        return llm
+    tools = tuple(tools)
+    key = (id(llm), tuple(map(id, tools)))
+    cached = _bound_cache.get(key)
+    if cached is not None:
+        return cached[2]
+    bound = llm.bind_tools(tools)
+    if len(_bound_cache) >= _BOUND_CACHE_MAX:
+        _bound_cache.clear()
+    _bound_cache[key] = (llm, tools, bound)
+    return bound
+
+
 def create_llm(streaming: bool = True) -> ChatOpenAI:
     """get_llm 的兼容别名（供外部调用方使用）。"""
     return get_llm(streaming=streaming)
@@ -56,4 +82,8 @@ def create_llm(streaming: bool = True) -> ChatOpenAI:
 def invalidate_llm_cache() -> None:
     """清除所有缓存的 LLM 实例。配置变更后应调用此函数。"""
     _llm_cache.clear()
+    _bound_cache.clear()
+    # .env 回退配置变更不经过模型池，同步清除模型名缓存
+    from model_pool import resolve_model_name
+    resolve_model_name.cache_clear()
     logger.info("LLM 缓存已清除")
@@ -12,7 +12,7 @@ from typing import Any
 from langchain_core.messages import AIMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
 
-from engine.llm_factory import get_llm
+from engine.llm_factory import get_llm_with_tools
 from engine.state import AgentState, build_plan_steps
 
 logger = logging.getLogger(__name__)
@@ -51,8 +51,7 @@ async def agent_node(state: AgentState, config: RunnableConfig) -> dict[str, Any
     llm_timeout = _settings.llm_request_timeout
     tool_timeout = _settings.tool_execution_timeout
 
-    llm = get_llm(streaming=True)
-    llm_with_tools = llm.bind_tools(tools) if tools else llm
+    llm_with_tools = get_llm_with_tools(tools, streaming=True)
 
     iterations = 0
     plan_data = None
@@ -11,7 +11,7 @@ from typing import Any
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
 
-from engine.llm_factory import get_llm
+from engine.llm_factory import get_llm_with_tools
 from engine.state import AgentState
 
 logger = logging.getLogger(__name__)
@@ -20,6 +20,47 @@ logger = logging.getLogger(__name__)
 async def executor_node(state: AgentState, config: RunnableConfig) -> dict[str, Any]:
     """步骤执行器节点。
 
+    若 replanner 以推测模式在后台评估，则步骤执行与评估并发进行：
+    评估结果为 finish/revise 时取消本步骤并应用决策，否则提交步骤结果。
+    """
+    from engine.nodes.replanner import take_speculative_replan, is_preempting, apply_replan_decision
+
+    sid = state.get("session_id", "unknown")
+    replan_task = take_speculative_replan(sid)
+    if replan_task is None:
+        return await _execute_step(state, config)
+
+    step_task = asyncio.create_task(_execute_step(state, config))
+    try:
+        decision = await replan_task
+    except asyncio.CancelledError:
+        step_task.cancel()
+        replan_task.cancel()
+        raise
+    except Exception as e:
+        # 与非推测路径一致：评估失败降级为继续执行，仍提交本步骤结果（不让 step_task 失去等待者）
+        logger.warning("[%s] 推测重规划评估失败，降级为继续执行: %s", sid, e)
+        decision = None
+
+    if not is_preempting(decision):
+        return await step_task
+
+    # 决策改变了后续执行 → 取消本步骤，不提交其结果
+    step_task.cancel()
+    try:
+        await step_task
+    except asyncio.CancelledError:
+        pass
+    logger.info("[%s] 推测重规划决策=%s，已取消当前步骤执行", sid, decision.action)
+
+    result = apply_replan_decision(decision, state.get("plan_data") or {}, state.get("current_step_index", 0))
+    result["replan_preempted"] = True
+    return result
+
+
+async def _execute_step(state: AgentState, config: RunnableConfig) -> dict[str, Any]:
+    """执行当前步骤。
+
     1. 获取当前步骤信息
     2. 构建步骤级 prompt（system_prompt + 计划上下文 + past_steps）
     3. 运行独立 ReAct 循环（与主 messages 分离）
@@ -46,6 +87,10 @@ async def executor_node(state: AgentState, config: RunnableConfig) -> dict[str,
     step_index = state.get("current_step_index", 0)
     system_prompt = state.get("system_prompt", "")
     past_steps = state.get("past_steps", [])
+    past_context = state.get("past_context") or ""
+    if past_steps and not past_context:
+        # 兼容旧检查点：无增量上下文时按 past_steps 重建一次
+        past_context = "\n".join(_format_past_step(i, s, r) for i, (s, r) in enumerate(past_steps))
 
     if step_index >= len(steps):
         logger.warning("step_index (%d) 超出步骤范围 (%d)", step_index, len(steps))
@@ -66,7 +111,7 @@ async def executor_node(state: AgentState, config: RunnableConfig) -> dict[str,
 
     # 构建步骤级 prompt
     executor_prompt = _build_executor_prompt(
-        system_prompt, plan_title, step_title, step_index, len(steps), past_steps
+        system_prompt, plan_title, step_title, step_index, len(steps), past_context
     )
 
     # 构建独立消息列表（不污染主 messages）
@@ -90,8 +135,7 @@ async def executor_node(state: AgentState, config: RunnableConfig) -> dict[str,
     llm_timeout = _settings.llm_request_timeout
     tool_timeout = _settings.tool_execution_timeout
 
-    llm = get_llm(streaming=True)
-    llm_with_tools = llm.bind_tools(tools) if tools else llm
+    llm_with_tools = get_llm_with_tools(tools, streaming=True)
 
     step_response = ""
     step_status = "completed"
@@ -124,7 +168,7 @@ async def executor_node(state: AgentState, config: RunnableConfig) -> dict[str,
                 content = response.content
                 if isinstance(content, list):
                     content = " ".join(
-                        item.get("text", str(item)) if isinstance(item, dict) else str(item)
+                        (item["text"] if "text" in item else str(item)) if isinstance(item, dict) else str(item)
                         for item in content
                     )
                 step_response += str(content)
@@ -183,27 +227,30 @@ async def executor_node(state: AgentState, config: RunnableConfig) -> dict[str,
 
     # 构建完整的 past_steps（追加当前步骤）
     updated_past_steps = list(past_steps) + [(step_title, step_response[:1000])]
+    # 增量追加当前步骤的上下文行，不重新格式化之前的步骤
+    new_line = _format_past_step(len(past_steps), step_title, step_response)
+    updated_past_context = f"{past_context}\n{new_line}" if past_context else new_line
 
     return {
         "messages": [summary_msg],
         "step_response": step_response[:1000],
         "current_step_index": step_index + 1,
         "past_steps": updated_past_steps,
+        "past_context": updated_past_context,
         "pending_events": pending_events,
     }
 
 
+def _format_past_step(index: int, title: str, response: str) -> str:
+    """格式化单个已完成步骤的上下文行。"""
+    return f"步骤 {index + 1} [{title}]: {response[:300]}"
+
+
 def _build_executor_prompt(
     system_prompt: str, plan_title: str, step_title: str,
-    step_index: int, total_steps: int, past_steps: list[tuple[str, str]]
+    step_index: int, total_steps: int, past_context: str
 ) -> str:
     """构建步骤级 prompt。"""
-    past_context = ""
-    if past_steps:
-        past_context = "\n".join(
-            f"步骤 {i+1} [{s}]: {r[:300]}" for i, (s, r) in enumerate(past_steps)
-        )
-
     past_section = f"已完成的步骤：\n{past_context}" if past_context else ""
 
     return f"""{system_prompt}
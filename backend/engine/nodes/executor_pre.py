@@ -21,29 +21,31 @@ async def executor_pre_node(state: AgentState, config: RunnableConfig) -> dict[s
     该节点有独立的 on_chain_end 回调，因此 running 事件
     会在 executor 开始执行前就到达前端。
     """
-    plan_data = state.get("plan_data")
+    state_get = state.get
+    plan_data = state_get("plan_data")
     if not plan_data:
         return {}
 
     steps = plan_data.get("steps", [])
-    step_index = state.get("current_step_index", 0)
+    step_index = state_get("current_step_index", 0)
 
     if step_index >= len(steps):
         return {}
 
     step = steps[step_index]
-    step_id = step["id"] if isinstance(step, dict) else step_index + 1
-    plan_id = plan_data.get("plan_id", "")
+    # 单次类型判断，同时得到 step_id 与 step_title
+    if isinstance(step, dict):
+        step_id, step_title = step["id"], step["title"]
+    else:
+        step_id, step_title = step_index + 1, str(step)
 
-    sid = state.get("session_id", "unknown")
-    step_title = step["title"] if isinstance(step, dict) else str(step)
     logger.info("[%s] ExecutorPre: 标记步骤 %d/%d 为 running - %s",
-                sid, step_index + 1, len(steps), step_title)
+                state_get("session_id", "unknown"), step_index + 1, len(steps), step_title)
 
     return {
         "pending_events": [{
             "type": "plan_updated",
-            "plan_id": plan_id,
+            "plan_id": plan_data.get("plan_id", ""),
             "step_id": step_id,
             "status": "running",
         }],
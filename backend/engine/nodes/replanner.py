@@ -4,7 +4,11 @@
 - continue: 继续下一步
 - revise: 修改剩余步骤
 - finish: 提前完成
+
+启用 speculative 时，LLM 评估在后台任务中进行，下一步骤同时开始执行，
+由 executor 在提交步骤结果前消费评估结果（见 take_speculative_replan）。
 """
+import asyncio
 import logging
 from typing import Any, Optional
 
@@ -16,6 +20,9 @@ from engine.state import AgentState
 
 logger = logging.getLogger(__name__)
 
+# 推测执行中的重规划评估任务（session_id → Task），由 executor 节点取走
+_speculative_replans: dict[str, asyncio.Task] = {}
+
 
 class ReplanDecision(BaseModel):
     """Replanner LLM 的结构化输出。"""
@@ -29,14 +36,19 @@ async def replanner_node(state: AgentState, config: RunnableConfig) -> dict[str,
     """重规划评估节点。
 
     1. 启发式预检：常规情况跳过 LLM 调用
-    2. LLM 结构化输出：continue / revise / finish
+    2. LLM 结构化输出：continue / revise / finish（speculative 时转入后台）
     3. revise 时更新 plan_data.steps，发出 plan_revised 事件
     """
     sid = state.get("session_id", "unknown")
 
+    # executor 已应用推测评估的 finish/revise 决策 → 沿用 replan_action，不再重复评估
+    if state.get("replan_preempted"):
+        return {"replan_preempted": False}
+
     graph_config = config.get("configurable", {}).get("graph_config", {})
     node_config = graph_config.get("graph", {}).get("nodes", {}).get("replanner", {})
     skip_on_success = node_config.get("skip_on_success", True)
+    every_n_steps = node_config.get("every_n_steps", 1)
 
     plan_data = state.get("plan_data")
     if not plan_data:
@@ -45,7 +57,6 @@ async def replanner_node(state: AgentState, config: RunnableConfig) -> dict[str,
     steps = plan_data.get("steps", [])
     step_index = state.get("current_step_index", 0)
     past_steps = state.get("past_steps", [])
-    plan_id = plan_data.get("plan_id", "")
     plan_title = plan_data.get("title", "")
 
     remaining = len(steps) - step_index
@@ -55,7 +66,19 @@ async def replanner_node(state: AgentState, config: RunnableConfig) -> dict[str,
         return {"replan_action": "finish"}
 
     # 启发式预检
-    if _should_skip_replan(past_steps, step_index, len(steps), skip_on_success):
+    if _should_skip_replan(past_steps, step_index, len(steps), skip_on_success, every_n_steps):
+        logger.debug("[%s][REPLANNER] 启发式跳过评估, step_index=%d/%d", sid, step_index, len(steps))
+        return {"replan_action": "continue"}
+
+    # 推测执行：评估转入后台，下一步骤立即开始，由 executor 在提交结果前等待决策
+    if node_config.get("speculative", False):
+        previous = _speculative_replans.pop(sid, None)
+        if previous is not None:
+            previous.cancel()
+        _speculative_replans[sid] = asyncio.create_task(
+            _evaluate_replan(plan_title, steps, past_steps, step_index, sid, config=config)
+        )
+        logger.info("[%s][REPLANNER] 推测执行：评估转入后台, step_index=%d", sid, step_index)
         return {"replan_action": "continue"}
 
     # LLM 评估
@@ -64,6 +87,26 @@ async def replanner_node(state: AgentState, config: RunnableConfig) -> dict[str,
     if decision is None:
         return {"replan_action": "continue"}
 
+    return apply_replan_decision(decision, plan_data, step_index)
+
+
+def take_speculative_replan(sid: str) -> Optional[asyncio.Task]:
+    """取走该会话推测执行中的重规划评估任务（无则返回 None）。"""
+    return _speculative_replans.pop(sid, None)
+
+
+def is_preempting(decision: Optional[ReplanDecision]) -> bool:
+    """决策是否会改变后续执行（finish，或带新步骤的 revise）。"""
+    if decision is None:
+        return False
+    return decision.action == "finish" or (decision.action == "revise" and bool(decision.revised_steps))
+
+
+def apply_replan_decision(decision: ReplanDecision, plan_data: dict, step_index: int) -> dict[str, Any]:
+    """将重规划决策转换为状态更新（finish 跳过剩余步骤，revise 替换剩余步骤）。"""
+    steps = plan_data.get("steps", [])
+    plan_id = plan_data.get("plan_id", "")
+
     result: dict[str, Any] = {"replan_action": decision.action}
     pending_events = []
 
@@ -114,6 +157,7 @@ def _should_skip_replan(
     step_index: int,
     total: int,
     skip_on_success: bool,
+    every_n_steps: int = 1,
 ) -> bool:
     """启发式预检：常规情况下跳过 LLM Replan 调用。
 
@@ -121,6 +165,7 @@ def _should_skip_replan(
     - 最后一步失败时，即使仅剩 1 步也不跳过（需要 LLM 评估是否调整策略）
     - 最后一步成功 + 仅剩 1 步 → 直接继续执行
     - 最后一步成功 + 配置允许跳过 → 直接继续执行
+    - 最后一步成功 + 已完成步数不是 every_n_steps 的整数倍 → 直接继续执行
     """
     # 检查最后一步是否包含错误
     last_step_failed = False
@@ -142,6 +187,10 @@ def _should_skip_replan(
     if skip_on_success:
         return True
 
+    # 上一步成功且未到评估间隔 → 本次不评估
+    if every_n_steps > 1 and step_index % every_n_steps != 0:
+        return True
+
     return False
 
 
@@ -61,6 +61,7 @@ async def summarizer_node(state: AgentState, config: RunnableConfig) -> dict[str
         "plan_data": None,
         "current_step_index": 0,
         "past_steps": [],  # 注意：使用 operator.add 的 reset 需要特殊处理
+        "past_context": "",
         "agent_outcome": None,
         "replan_action": None,
         "pending_events": pending_events,
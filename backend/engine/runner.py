@@ -23,6 +23,7 @@ from engine.tool_resolver import resolve_tools, resolve_executor_tools
 
 # 延迟导入避免循环引用，在 _run_uncached 中使用
 _register_plan_approval_context = None
+_unregister_plan_approval_context = None
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +37,7 @@ async def run_agent(
     """Agent 执行的唯一入口。
 
     编排 StateGraph 执行 + Middleware 管线。
-    启用 LLM 缓存时自动走缓存路径。
+    启用 LLM 缓存时自动走缓存路径；启用语义缓存时语义层位于精确缓存之前。
     """
     from config import settings
 
@@ -50,7 +51,10 @@ async def run_agent(
         await mw.on_run_start(ctx)
 
     try:
-        if settings.enable_llm_cache:
+        if settings.enable_semantic_cache:
+            async for event in _semantic_cached_run(message, session_history, ctx, mws):
+                yield event
+        elif settings.enable_llm_cache:
             async for event in _cached_run(message, session_history, ctx, mws):
                 yield event
         else:
@@ -66,13 +70,48 @@ async def run_agent(
             await mw.on_run_end(ctx)
 
 
+async def _semantic_cached_run(message, session_history, ctx, mws):
+    """带语义缓存的执行路径（未命中时回落到精确 LLM 缓存或直接执行）。"""
+    from cache import semantic_cache
+    from config import settings
+
+    async def generator():
+        if settings.enable_llm_cache:
+            inner = _cached_run(message, session_history, ctx, mws)
+        else:
+            inner = _run_uncached(message, session_history, ctx, mws)
+        async for event in inner:
+            yield event
+
+    async for event in semantic_cache.get_or_generate(
+        key_params=_build_cache_key_params(message, session_history, ctx),
+        generator_func=generator,
+        stream=ctx.stream,
+    ):
+        yield event
+
+
 async def _cached_run(message, session_history, ctx, mws):
     """带 LLM 缓存的执行路径。"""
-    from prompt_builder import build_system_prompt
     from cache import llm_cache
+
+    async def generator():
+        async for event in _run_uncached(message, session_history, ctx, mws):
+            yield event
+
+    async for event in llm_cache.get_or_generate(
+        key_params=_build_cache_key_params(message, session_history, ctx),
+        generator_func=generator,
+        stream=ctx.stream,
+    ):
+        yield event
+
+
+def _build_cache_key_params(message, session_history, ctx) -> dict:
+    """构建 LLM 缓存 / 语义缓存共用的缓存键参数。"""
     from config import settings
 
-    system_prompt = build_system_prompt()
+    system_prompt = _get_system_prompt(ctx)
     recent_history = []
     for msg in session_history[-3:]:
         recent_history.append({
@@ -89,7 +128,7 @@ async def _cached_run(message, session_history, ctx, mws):
     except Exception:
         pass
 
-    cache_key_params = {
+    return {
         "system_prompt": system_prompt,
         "recent_history": recent_history,
         "current_message": message,
@@ -98,21 +137,10 @@ async def _cached_run(message, session_history, ctx, mws):
         "memory_fingerprint": memory_fingerprint,
     }
 
-    async def generator():
-        async for event in _run_uncached(message, session_history, ctx, mws):
-            yield event
-
-    async for event in llm_cache.get_or_generate(
-        key_params=cache_key_params,
-        generator_func=generator,
-        stream=ctx.stream,
-    ):
-        yield event
-
 
 async def _run_uncached(message, session_history, ctx, mws):
     """核心执行：统一 StateGraph 编排。"""
-    from prompt_builder import build_system_prompt, build_implicit_recall_context
+    from prompt_builder import build_implicit_recall_context
     from config import settings as _settings
 
     sid = ctx.session_id
@@ -147,7 +175,7 @@ async def _run_uncached(message, session_history, ctx, mws):
     # SystemMessage 使用固定 ID，确保 add_messages reducer 正确替换而非追加
     yield events.build_phase("prompt", "正在构建系统提示词...")
     await asyncio.sleep(0)
-    system_prompt = build_system_prompt()
+    system_prompt = _get_system_prompt(ctx)
 
     # 替换动态占位符（session_id 和工作目录）
     from session_context import get_tmp_dir_for_session
@@ -206,7 +234,8 @@ async def _run_uncached(message, session_history, ctx, mws):
     # 5. 流式执行 + 中间件管线
     logger.info("[%s] 开始图流式执行", sid)
     async for event in _pipe(
-        stream_graph_events(graph, input_state, run_config, system_prompt=system_prompt),
+        stream_graph_events(graph, input_state, run_config,
+                            system_prompt=system_prompt, debug=ctx.debug),
         mws, ctx,
     ):
         yield event
@@ -224,23 +253,30 @@ async def _run_uncached(message, session_history, ctx, mws):
                 plan_id = plan_info.get("plan_id", "")
 
                 # 注册审批队列到全局表，使 /api/plan/approve 端点能找到对应队列
-                global _register_plan_approval_context
+                global _register_plan_approval_context, _unregister_plan_approval_context
                 if _register_plan_approval_context is None:
                     from app import register_plan_approval_context as _reg
+                    from app import unregister_plan_approval_context as _unreg
                     _register_plan_approval_context = _reg
+                    _unregister_plan_approval_context = _unreg
                 _register_plan_approval_context(plan_id, ctx.approval_queue)
 
-                # 发送审批请求 SSE 事件
-                yield events.build_plan_approval_request(plan_info)
+                try:
+                    # 发送审批请求 SSE 事件
+                    yield events.build_plan_approval_request(plan_info)
 
-                # 阻塞等待审批（保持 SSE 流不断开）
-                approved = await _wait_for_approval(ctx, plan_id)
+                    # 阻塞等待审批（保持 SSE 流不断开）
+                    approved = await _wait_for_approval(ctx, plan_id)
+                finally:
+                    # 审批结束（含超时 / 客户端断开）即注销，不遗留到过期清理
+                    _unregister_plan_approval_context(plan_id)
                 logger.info("[%s] 审批结果: approved=%s", sid, approved)
 
                 # resume 图
                 resume_cmd = Command(resume={"approved": approved})
                 async for event in _pipe(
-                    stream_graph_events(graph, resume_cmd, run_config, system_prompt=system_prompt),
+                    stream_graph_events(graph, resume_cmd, run_config,
+                                        system_prompt=system_prompt, debug=ctx.debug),
                     mws, ctx,
                 ):
                     yield event
@@ -250,6 +286,14 @@ async def _run_uncached(message, session_history, ctx, mws):
     yield events.build_done()
 
 
+def _get_system_prompt(ctx: RunContext) -> str:
+    """获取本次请求的系统提示词，同一请求内只构建一次（缓存在 ctx 上）。"""
+    if ctx.system_prompt is None:
+        from prompt_builder import build_system_prompt
+        ctx.system_prompt = build_system_prompt()
+    return ctx.system_prompt
+
+
 def _extract_interrupt_payload(tasks) -> dict | None:
     """从 graph state tasks 中提取 interrupt payload。"""
     if not tasks:
@@ -70,12 +70,16 @@ class AgentState(TypedDict, total=False):
 
     # 步骤执行历史（executor 追加，summarizer 重置）
     past_steps: list[tuple[str, str]]
+    # 已完成步骤的 prompt 上下文（与 past_steps 同步，executor 每步只追加一行）
+    past_context: str
 
     # Executor 节点输出
     step_response: str
 
     # Replanner 决策
     replan_action: Optional[str]       # "continue" | "revise" | "finish"
+    # 推测重规划决策已由 executor 应用（replanner 据此跳过重复评估）
+    replan_preempted: bool
 
     # 侧通道 SSE 事件（plan_created/updated/revised 等）
     pending_events: Annotated[list[dict], operator.add]
@@ -5,11 +5,14 @@
 """
 import logging
 import time
-from typing import AsyncGenerator, Optional, Union
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import AsyncGenerator, Mapping, Optional, Union
 
 from langgraph.types import Command
 
 from engine import events
+from model_pool import resolve_model_name
 
 logger = logging.getLogger(__name__)
 
@@ -154,11 +157,8 @@ class ThinkTagFilter:
         return 0
 
 
-def _serialize_debug_messages(input_data) -> str:
-    """序列化 LLM 输入消息，用于调试显示。
-
-    直接显示传给 LLM 的消息列表（SystemMessage + HumanMessage + ...）。
-    """
+def _extract_input_messages(input_data) -> list:
+    """从 on_chat_model_start 的 input 中取出消息列表（兼容多种嵌套格式）。"""
     messages = []
 
     if isinstance(input_data, dict):
@@ -179,8 +179,12 @@ def _serialize_debug_messages(input_data) -> str:
                     messages = val
                     break
 
-    parts = []
-    for msg in messages:
+    return messages
+
+
+def _iter_message_parts(messages):
+    """逐段产出消息序列化文本（"[role]\ncontent"，消息间以 "\n---\n" 分隔）。"""
+    for i, msg in enumerate(messages):
         # 获取消息类型
         role = type(msg).__name__
         # 获取消息内容
@@ -191,9 +195,77 @@ def _serialize_debug_messages(input_data) -> str:
             role = msg.get("role", msg.get("type", role))
         else:
             content = str(msg)
-        parts.append(f"[{role}]\n{content}")
+        if i:
+            yield "\n---\n"
+        yield f"[{role}]\n"
+        yield content
 
-    return "\n---\n".join(parts) if parts else "(no messages)"
+
+def _serialize_debug_messages(input_data, last_only: bool = False) -> str:
+    """序列化 LLM 输入消息，用于调试显示。
+
+    直接显示传给 LLM 的消息列表（SystemMessage + HumanMessage + ...）。
+    last_only=True 时只序列化最后一条消息（非调试模式下前端仅用输入末尾作活动提示）。
+    """
+    messages = _extract_input_messages(input_data)
+    if last_only:
+        messages = messages[-1:]
+    return "".join(_iter_message_parts(messages)) if messages else "(no messages)"
+
+
+def _estimate_input_tokens(input_data, node: str, ctx: "_StreamContext") -> int:
+    """估算完整 LLM 输入（全部消息 + 工具定义）的 token 数，不拼接完整输入字符串。
+
+    非调试模式下 TrackedCall.input 只含最后一条消息，token / 成本估算需使用此值。
+    """
+    messages = _extract_input_messages(input_data)
+    if not messages:
+        return events.estimate_tokens("(no messages)") + _tool_schema_tokens(node, ctx)
+    return events.estimate_tokens_parts(_iter_message_parts(messages)) + _tool_schema_tokens(node, ctx)
+
+
+def _node_tools(node: str, ctx: "_StreamContext") -> list:
+    """节点绑定的工具列表（仅 agent / executor 节点带工具）。"""
+    configurable = ctx.config.get("configurable", {})
+    if node == "agent":
+        return configurable.get("agent_tools", [])
+    if node == "executor":
+        return configurable.get("executor_tools", [])
+    return []
+
+
+def _serialize_tools(tools: list) -> str:
+    """将工具列表序列化为 JSON schema 文本（调试展示与 token 估算共用）。"""
+    import json
+
+    # 工具对象可能是 BaseTool 或 dict，尝试转换
+    def _serialize_tool(t):
+        if hasattr(t, "name") and hasattr(t, "description") and hasattr(t, "args_schema"):
+            # Langchain BaseTool
+            schema = t.args_schema.schema() if hasattr(t.args_schema, "schema") else {}
+            return {"type": "function", "function": {"name": t.name, "description": t.description, "parameters": schema}}
+        elif isinstance(t, dict):
+            return t
+        return str(t)
+
+    serialized_tools = [_serialize_tool(t) for t in tools]
+    return json.dumps(serialized_tools, ensure_ascii=False, indent=2, default=lambda o: str(o))
+
+
+def _tool_schema_tokens(node: str, ctx: "_StreamContext") -> int:
+    """节点工具定义的 token 估算值（工具列表在单次执行内不变，按节点缓存）。"""
+    cached = ctx.tool_tokens.get(node)
+    if cached is not None:
+        return cached
+    tokens = 0
+    tools = _node_tools(node, ctx)
+    if tools:
+        try:
+            tokens = events.estimate_tokens(_serialize_tools(tools))
+        except Exception as e:
+            logger.debug(f"Failed to estimate tool schema tokens: {e}")
+    ctx.tool_tokens[node] = tokens
+    return tokens
 
 
 def _format_debug_input(messages_str: str) -> str:
@@ -201,13 +273,198 @@ def _format_debug_input(messages_str: str) -> str:
     return messages_str
 
 
-# 节点到 motivation 的映射
-_NODE_MOTIVATIONS = {
+# 节点到 motivation 的映射（只读常量）
+_NODE_MOTIVATIONS: Mapping[str, str] = MappingProxyType({
     "agent": "调用大模型进行推理",
     "executor_pre": "准备执行计划步骤",
     "executor": "执行计划步骤",
     "replanner": "评估是否需要调整计划",
     "summarizer": "生成计划执行总结",
+})
+
+
+@dataclass
+class _StreamContext:
+    """单次流式执行的共享状态，按引用传给各事件处理函数。"""
+    sid: str
+    config: dict
+    debug: bool = True  # 前端是否开启调试面板；关闭时跳过完整输入序列化
+    # 进行中的调用：run_id → TrackedCall（LLM 与工具的 run_id 均为唯一 UUID，共用一张表）
+    debug_tracking: dict[str, events.TrackedCall] = field(default_factory=dict)
+    # 使用事件指纹去重（替代旧的 seen_event_count 计数器）。
+    # 拆分 executor_pre + executor 后，每个节点的 on_chain_end 输出只含
+    # 该节点自身的 pending_events（非累积值），计数器方式会导致事件丢失。
+    seen_event_fps: set[tuple] = field(default_factory=set)
+    token_counts: dict = field(default_factory=dict)  # 按节点统计 token 数量
+    think_filter: ThinkTagFilter = field(default_factory=ThinkTagFilter)  # 过滤推理模型的 <think> 标签
+    tool_tokens: dict[str, int] = field(default_factory=dict)  # 按节点缓存的工具定义 token 估算值
+
+
+def _on_chat_model_stream(event: dict, metadata: dict, ctx: _StreamContext):
+    """on_chat_model_stream → TOKEN 事件。"""
+    chunk = (event.get("data") or events.EMPTY).get("chunk")
+    # getattr 带默认值，不走 hasattr 的异常控制流
+    raw = getattr(chunk, "content", None) if chunk is not None else None
+    if raw:
+        node = metadata.get("langgraph_node", "unknown")
+        ctx.token_counts[node] = ctx.token_counts.get(node, 0) + 1
+        # chunk.content 可能是 str 或 list（DeepSeek-R1 等推理模型）
+        if isinstance(raw, list):
+            # 列表格式：提取各部分的文本，reasoning_content 直接送入过滤器
+            parts = []
+            for item in raw:
+                if isinstance(item, dict):
+                    parts.append(item["text"] if "text" in item else str(item))
+                else:
+                    parts.append(str(item))
+            content_str = "".join(parts)
+        else:
+            content_str = str(raw)
+        # 过滤推理模型的 <think>...</think> 标签
+        filtered = ctx.think_filter.feed(content_str)
+        if filtered:
+            return (events.build_token(filtered),)
+    return None
+
+
+def _on_chat_model_start(event: dict, metadata: dict, ctx: _StreamContext):
+    """on_chat_model_start → LLM_START 事件。"""
+    run_id = event.get("run_id", "")
+    node = metadata.get("langgraph_node", "")
+    data = event.get("data") or events.EMPTY
+    input_data_msg = data.get("input", {})
+    if ctx.debug:
+        full_input = _build_debug_input(input_data_msg, metadata, node, ctx)
+        input_tokens = None  # 按完整调试输入估算
+    else:
+        full_input = _serialize_debug_messages(input_data_msg, last_only=True)
+        # 展示文本只有最后一条消息，token / 成本估算仍需覆盖完整输入
+        input_tokens = _estimate_input_tokens(input_data_msg, node, ctx)
+
+    ctx.debug_tracking[run_id] = events.TrackedCall(time.time(), node, full_input, input_tokens)
+
+    mot = _NODE_MOTIVATIONS.get(node, "调用大模型处理请求")
+    model_name = resolve_model_name("llm")
+    logger.info("[%s] Stream LLM 开始: node=%s, model=%s", ctx.sid, node, model_name)
+    return (events.build_llm_start(run_id[:12], node, model_name, full_input, mot),)
+
+
+def _build_debug_input(input_data_msg, metadata: dict, node: str, ctx: _StreamContext) -> str:
+    """构建调试面板展示的完整 LLM 输入（Model Config + 消息列表 + Tools schema）。"""
+    input_messages = _serialize_debug_messages(input_data_msg)
+    full_input = _format_debug_input(input_messages)
+
+    # 提取 Model Config 并将其置于最初始的位置
+    try:
+        model_config = {
+            "provider": metadata.get("ls_provider", "unknown"),
+            "model_name": metadata.get("ls_model_name", "unknown"),
+            "temperature": metadata.get("ls_temperature"),
+            "max_tokens": metadata.get("ls_max_tokens"),
+        }
+        # 过滤掉 None 值的项以保持清爽
+        model_config = {k: v for k, v in model_config.items() if v is not None}
+        
+        import json
+        config_str = json.dumps(model_config, ensure_ascii=False, indent=2)
+        full_input = f"[Model Config]\n{config_str}\n---\n" + full_input
+    except Exception as e:
+        logger.debug(f"Failed to extract model config for debug: {e}")
+
+    # 提取 tools schema 并追加到 debug input 中，以便前端能看到消耗了 token 的工具定义
+    tools = _node_tools(node, ctx)
+    if tools:
+        try:
+            tools_str = _serialize_tools(tools)
+            tools_block = f"\n---\n[Tools]\n{tools_str}\n---\n"
+            
+            # 尝试将 Tools 插在 HumanMessage 之前，如果找不到 HumanMessage 则追加在末尾
+            human_msg_idx = full_input.rfind("\n[HumanMessage]\n")
+            if human_msg_idx == -1:
+                human_msg_idx = full_input.rfind("[HumanMessage]\n")
+                
+            if human_msg_idx != -1:
+                full_input = full_input[:human_msg_idx] + tools_block + full_input[human_msg_idx:]
+            else:
+                full_input += tools_block
+        except Exception as e:
+            logger.debug(f"Failed to serialize tools for debug: {e}")
+
+    return full_input
+
+
+def _on_chat_model_end(event: dict, metadata: dict, ctx: _StreamContext):
+    """on_chat_model_end → LLM_END 事件。"""
+    run_id = event.get("run_id", "")
+    tracked = ctx.debug_tracking.pop(run_id, None)
+    if tracked is None:
+        return None
+    node = tracked.node
+    dur = int((time.time() - tracked.start_time) * 1000)
+    node_tokens = ctx.token_counts.get(node, 0)
+    logger.info("[%s] Stream LLM 结束: node=%s, duration=%dms, stream_tokens=%d",
+                ctx.sid, node, dur, node_tokens)
+    # 提取本轮 LLM 调用累积的推理内容，附加到 llm_end 事件。
+    # 注意：使用 extract_reasoning() 而非重置过滤器，
+    # 因为 <think> 块可能跨越多次 LLM 调用（中间穿插工具调用）。
+    reasoning = ctx.think_filter.extract_reasoning()
+    llm_end_event = events.build_llm_end_from_raw(event, tracked, debug=ctx.debug)
+    if reasoning:
+        llm_end_event["reasoning"] = reasoning
+    return (llm_end_event,)
+
+
+def _on_tool_start(event: dict, metadata: dict, ctx: _StreamContext):
+    """on_tool_start → TOOL_START 事件。"""
+    run_id = event.get("run_id", "")
+    tool_name = event.get("name", "unknown")
+    ctx.debug_tracking[run_id] = events.TrackedCall(time.time(), tool_name)
+    logger.info("[%s] Stream 工具开始: %s", ctx.sid, tool_name)
+    return (events.build_tool_start_from_raw(event),)
+
+
+def _on_tool_end(event: dict, metadata: dict, ctx: _StreamContext):
+    """on_tool_end → TOOL_END 事件。"""
+    run_id = event.get("run_id", "")
+    tracked = ctx.debug_tracking.pop(run_id, None)
+    if tracked is not None:
+        duration_ms = int((time.time() - tracked.start_time) * 1000)
+        tool_name = tracked.node
+    else:
+        duration_ms, tool_name = None, "unknown"
+    logger.info("[%s] Stream 工具结束: %s, duration=%dms", ctx.sid, tool_name, duration_ms or 0)
+    return (events.build_tool_end_from_raw(event, duration_ms),)
+
+
+def _on_chain_end(event: dict, metadata: dict, ctx: _StreamContext):
+    """on_chain_end → 提取 pending_events（侧通道 SSE 事件）。"""
+    output = (event.get("data") or events.EMPTY).get("output", events.EMPTY)
+    if not isinstance(output, dict):
+        return None
+    pending = output.get("pending_events", [])
+    if not isinstance(pending, list):
+        return None
+    result = []
+    for pe in pending:
+        if isinstance(pe, dict) and "type" in pe:
+            # 构造事件指纹用于去重：同一事件可能在不同层级的
+            # on_chain_end 中重复出现（节点级 vs 图级）
+            # 使用元组而非格式化字符串，避免每个事件分配并拼接新字符串
+            fp = (pe.get("type"), pe.get("plan_id", ""), pe.get("step_id", ""), pe.get("status", ""))
+            if fp not in ctx.seen_event_fps:
+                ctx.seen_event_fps.add(fp)
+                result.append(pe)
+    return result
+
+
+# 事件类型 → 处理函数（返回待输出事件的序列，或 None 表示无输出）
+_EVENT_HANDLERS = {
+    "on_chat_model_stream": _on_chat_model_stream,
+    "on_chat_model_start": _on_chat_model_start,
+    "on_chat_model_end": _on_chat_model_end,
+    "on_tool_start": _on_tool_start,
+    "on_tool_end": _on_tool_end,
+    "on_chain_end": _on_chain_end,
 }
 
 
@@ -217,10 +474,11 @@ async def stream_graph_events(
     config: dict,
     *,
     system_prompt: str = "",
+    debug: bool = True,
 ) -> AsyncGenerator[dict, None]:
     """StateGraph astream_events → 标准化 AgentEvent dict 流。
 
-    处理 5 类标准事件 + pending_events 侧通道：
+    处理 5 类标准事件 + pending_events 侧通道（分发见 _EVENT_HANDLERS）：
     - on_chat_model_stream → TOKEN 事件
     - on_chat_model_start → LLM_START 事件
     - on_chat_model_end → LLM_END 事件
@@ -233,173 +491,27 @@ async def stream_graph_events(
         input_data: 初始状态 dict 或 Command（resume 场景）
         config: 运行配置（含 thread_id 等）
         system_prompt: 用于调试输入格式化
+        debug: 前端是否开启调试；关闭时 llm_start/llm_end 不构建完整调试载荷
     """
-    from model_pool import resolve_model
-
     # 从 config 中获取 session_id
     sid = config.get("configurable", {}).get("session_id", "unknown")
-
-    debug_tracking = {}
-    # 使用事件指纹去重（替代旧的 seen_event_count 计数器）。
-    # 拆分 executor_pre + executor 后，每个节点的 on_chain_end 输出只含
-    # 该节点自身的 pending_events（非累积值），计数器方式会导致事件丢失。
-    seen_event_fps: set[str] = set()
-    token_counts = {}  # 按节点统计 token 数量
-    think_filter = ThinkTagFilter()  # 过滤推理模型的 <think> 标签
+    ctx = _StreamContext(sid=sid, config=config, debug=debug)
+    handlers_get = _EVENT_HANDLERS.get
 
     async for event in graph.astream_events(input_data, version="v2", config=config):
-        kind = event.get("event", "")
-        metadata = event.get("metadata", {})
-
-        if kind == "on_chat_model_stream":
-            chunk = (event.get("data") or {}).get("chunk", None)
-            if chunk and hasattr(chunk, "content") and chunk.content:
-                node = metadata.get("langgraph_node", "unknown")
-                token_counts[node] = token_counts.get(node, 0) + 1
-                # chunk.content 可能是 str 或 list（DeepSeek-R1 等推理模型）
-                raw = chunk.content
-                if isinstance(raw, list):
-                    # 列表格式：提取各部分的文本，reasoning_content 直接送入过滤器
-                    parts = []
-                    for item in raw:
-                        if isinstance(item, dict):
-                            parts.append(item.get("text", str(item)))
-                        else:
-                            parts.append(str(item))
-                    content_str = "".join(parts)
-                else:
-                    content_str = str(raw)
-                # 过滤推理模型的 <think>...</think> 标签
-                filtered = think_filter.feed(content_str)
-                if filtered:
-                    yield events.build_token(filtered)
-
-        elif kind == "on_chat_model_start":
-            run_id = event.get("run_id", "")
-            node = metadata.get("langgraph_node", "")
-            data = event.get("data") or {}
-            input_data_msg = data.get("input", {})
-            input_messages = _serialize_debug_messages(input_data_msg)
-            full_input = _format_debug_input(input_messages)
-
-            # 提取 Model Config 并将其置于最初始的位置
-            try:
-                model_config = {
-                    "provider": metadata.get("ls_provider", "unknown"),
-                    "model_name": metadata.get("ls_model_name", "unknown"),
-                    "temperature": metadata.get("ls_temperature"),
-                    "max_tokens": metadata.get("ls_max_tokens"),
-                }
-                # 过滤掉 None 值的项以保持清爽
-                model_config = {k: v for k, v in model_config.items() if v is not None}
-                
-                import json
-                config_str = json.dumps(model_config, ensure_ascii=False, indent=2)
-                full_input = f"[Model Config]\n{config_str}\n---\n" + full_input
-            except Exception as e:
-                logger.debug(f"Failed to extract model config for debug: {e}")
-
-            # 提取 tools schema 并追加到 debug input 中，以便前端能看到消耗了 token 的工具定义
-            tools = []
-            configurable = config.get("configurable", {})
-            if node == "agent":
-                tools = configurable.get("agent_tools", [])
-            elif node == "executor":
-                tools = configurable.get("executor_tools", [])
-                
-            if tools:
-                import json
-                try:
-                    # 工具对象可能是 BaseTool 或 dict，尝试转换
-                    def _serialize_tool(t):
-                        if hasattr(t, "name") and hasattr(t, "description") and hasattr(t, "args_schema"):
-                            # Langchain BaseTool
-                            schema = t.args_schema.schema() if hasattr(t.args_schema, "schema") else {}
-                            return {"type": "function", "function": {"name": t.name, "description": t.description, "parameters": schema}}
-                        elif isinstance(t, dict):
-                            return t
-                        return str(t)
-                        
-                    serialized_tools = [_serialize_tool(t) for t in tools]
-                    tools_str = json.dumps(serialized_tools, ensure_ascii=False, indent=2, default=lambda o: str(o))
-                    tools_block = f"\n---\n[Tools]\n{tools_str}\n---\n"
-                    
-                    # 尝试将 Tools 插在 HumanMessage 之前，如果找不到 HumanMessage 则追加在末尾
-                    human_msg_idx = full_input.rfind("\n[HumanMessage]\n")
-                    if human_msg_idx == -1:
-                        human_msg_idx = full_input.rfind("[HumanMessage]\n")
-                        
-                    if human_msg_idx != -1:
-                        full_input = full_input[:human_msg_idx] + tools_block + full_input[human_msg_idx:]
-                    else:
-                        full_input += tools_block
-                except Exception as e:
-                    logger.debug(f"Failed to serialize tools for debug: {e}")
-
-            debug_tracking[run_id] = {
-                "start_time": time.time(),
-                "node": node,
-                "input": full_input,
-            }
-
-            mot = _NODE_MOTIVATIONS.get(node, "调用大模型处理请求")
-            model_name = resolve_model("llm").get("model", "unknown")
-            logger.info("[%s] Stream LLM 开始: node=%s, model=%s", sid, node, model_name)
-            yield events.build_llm_start(run_id[:12], node, model_name, full_input, mot)
-
-        elif kind == "on_chat_model_end":
-            run_id = event.get("run_id", "")
-            tracked = debug_tracking.pop(run_id, None)
-            if tracked:
-                node = tracked.get("node", "")
-                dur = int((time.time() - tracked["start_time"]) * 1000)
-                node_tokens = token_counts.get(node, 0)
-                logger.info("[%s] Stream LLM 结束: node=%s, duration=%dms, stream_tokens=%d",
-                            sid, node, dur, node_tokens)
-                # 提取本轮 LLM 调用累积的推理内容，附加到 llm_end 事件。
-                # 注意：使用 extract_reasoning() 而非重置过滤器，
-                # 因为 <think> 块可能跨越多次 LLM 调用（中间穿插工具调用）。
-                reasoning = think_filter.extract_reasoning()
-                llm_end_event = events.build_llm_end_from_raw(event, tracked)
-                if reasoning:
-                    llm_end_event["reasoning"] = reasoning
-                yield llm_end_event
-
-        elif kind == "on_tool_start":
-            run_id = event.get("run_id", "")
-            tool_name = event.get("name", "unknown")
-            debug_tracking[f"tool_{run_id}"] = {"start_time": time.time(), "name": tool_name}
-            logger.info("[%s] Stream 工具开始: %s", sid, tool_name)
-            yield events.build_tool_start_from_raw(event)
-
-        elif kind == "on_tool_end":
-            run_id = event.get("run_id", "")
-            tracked = debug_tracking.pop(f"tool_{run_id}", None)
-            duration_ms = int((time.time() - tracked["start_time"]) * 1000) if tracked else None
-            tool_name = tracked.get("name", "unknown") if tracked else "unknown"
-            logger.info("[%s] Stream 工具结束: %s, duration=%dms", sid, tool_name, duration_ms or 0)
-            yield events.build_tool_end_from_raw(event, duration_ms)
-
-        elif kind == "on_chain_end":
-            # 从节点输出中提取 pending_events（侧通道 SSE 事件）
-            output = (event.get("data") or {}).get("output", {})
-            if isinstance(output, dict):
-                pending = output.get("pending_events", [])
-                if isinstance(pending, list):
-                    for pe in pending:
-                        if isinstance(pe, dict) and "type" in pe:
-                            # 构造事件指纹用于去重：同一事件可能在不同层级的
-                            # on_chain_end 中重复出现（节点级 vs 图级）
-                            fp = f"{pe.get('type')}:{pe.get('plan_id','')}:{pe.get('step_id','')}:{pe.get('status','')}"
-                            if fp not in seen_event_fps:
-                                seen_event_fps.add(fp)
-                                yield pe
+        handler = handlers_get(event.get("event", ""))
+        if handler is None:
+            continue
+        out = handler(event, event.get("metadata") or events.EMPTY, ctx)
+        if out:
+            for evt in out:
+                yield evt
 
     # 流结束，刷新 think 标签过滤器缓冲区（输出可能残留的非 think 内容）
-    remaining = think_filter.flush()
+    remaining = ctx.think_filter.flush()
     if remaining:
         yield events.build_token(remaining)
 
     # 流结束，输出各节点 token 统计
-    if token_counts:
-        logger.info("[%s] Stream 结束, 各节点 token 统计: %s", sid, token_counts)
+    if ctx.token_counts:
+        logger.info("[%s] Stream 结束, 各节点 token 统计: %s", sid, ctx.token_counts)
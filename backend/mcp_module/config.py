@@ -2,7 +2,12 @@
 
 Handles loading and saving mcp_servers.json from user data directory,
 and merges external configurations (like Claude Desktop and Claude Code).
+
+文件读写通过 aiofiles 异步进行，避免大文件（如 ~/.claude.json）阻塞事件循环。
 """
+import asyncio
+import copy
+import functools
 import json
 import logging
 import os
@@ -10,8 +15,18 @@ import platform
 from pathlib import Path
 from typing import Any
 
+import aiofiles
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时回退到标准库 json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# get_active_config 合并结果缓存：(源文件签名, 合并后配置)
+_active_cache: tuple[tuple, dict[str, Any]] | None = None
+
 
 def _get_config_file() -> Path:
     """Get mcp_servers.json path from data directory."""
@@ -19,37 +34,35 @@ def _get_config_file() -> Path:
     return settings.get_data_path() / "mcp_servers.json"
 
 
+@functools.cache
 def _get_claude_desktop_config_path() -> Path | None:
-    """Locate Claude Desktop config file based on OS."""
+    """Locate Claude Desktop config file based on OS.
+
+    平台与主目录在进程内不变，候选路径只解析一次；文件是否存在由调用方 stat 判断。
+    """
     system = platform.system()
     if system == "Windows":
         appdata = os.getenv("APPDATA")
         if appdata:
-            path = Path(appdata) / "Claude" / "claude_desktop_config.json"
-            if path.exists():
-                return path
+            return Path(appdata) / "Claude" / "claude_desktop_config.json"
     elif system == "Darwin":
-        path = Path.home() / "Library" / "Application Support" / "Claude" / "claude_desktop_config.json"
-        if path.exists():
-            return path
+        return Path.home() / "Library" / "Application Support" / "Claude" / "claude_desktop_config.json"
     return None
 
 
-def _get_claude_code_config_path() -> Path | None:
-    """Locate Claude Code config file."""
-    path = Path.home() / ".claude.json"
-    if path.exists():
-        return path
-    return None
+@functools.cache
+def _get_claude_code_config_path() -> Path:
+    """Locate Claude Code config file (candidate path, may not exist)."""
+    return Path.home() / ".claude.json"
 
 
-def load_config() -> dict[str, Any]:
+async def load_config() -> dict[str, Any]:
     """Load MCP server configurations from mcp_servers.json."""
     config_file = _get_config_file()
     if not config_file.exists():
         return {"servers": {}}
     try:
-        data = json.loads(config_file.read_text(encoding="utf-8-sig"))
+        data = await _read_json(config_file)
         if "servers" not in data:
             data["servers"] = {}
         return data
@@ -58,87 +71,142 @@ def load_config() -> dict[str, Any]:
         return {"servers": {}}
 
 
-def get_active_config() -> dict[str, Any]:
-    """Load and merge local MCP servers with Claude Desktop/Code configs."""
-    local_config = load_config()
-    merged_servers = {}
-    
+async def _read_json(path: Path) -> Any:
+    """异步读取 JSON 文件（兼容 UTF-8 BOM），优先使用 orjson 解析。"""
+    async with aiofiles.open(path, "rb") as f:
+        raw = (await f.read()).removeprefix(b"\xef\xbb\xbf")
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _file_signature(path: Path | None) -> tuple:
+    """单个配置文件的签名 (path, mtime_ns, size)，不存在时为 (path, 0, 0)。"""
+    if path is None:
+        return (None, 0, 0)
+    try:
+        st = path.stat()
+        return (str(path), st.st_mtime_ns, st.st_size)
+    except OSError:
+        return (str(path), 0, 0)
+
+
+def invalidate_config_cache() -> None:
+    """清除合并配置缓存，下次 get_active_config 重新读取所有源文件。"""
+    global _active_cache
+    _active_cache = None
+
+
+async def get_active_config() -> dict[str, Any]:
+    """Load and merge local MCP servers with Claude Desktop/Code configs.
+
+    合并结果按各源文件 (mtime_ns, size) 签名缓存，文件未变化时只需 stat。
+    """
+    global _active_cache
+
     # 1. Load Claude configs first so local config can override them
     claude_paths = {
         "claude_desktop": _get_claude_desktop_config_path(),
         "claude_code": _get_claude_code_config_path(),
     }
+    # 签名的 stat 同时用于判断文件是否存在（不存在时 mtime 为 0）
+    sig = tuple(_file_signature(p) for p in (_get_config_file(), *claude_paths.values()))
+    cached = _active_cache
+    if cached is not None and cached[0] == sig:
+        # 返回深拷贝防止外部修改污染缓存
+        return copy.deepcopy(cached[1])
+
+    # 缓存未命中：并发读取本地配置与各 Claude 配置
+    sources = [
+        (source, path)
+        for (source, path), (_, mtime, _) in zip(claude_paths.items(), sig[1:])
+        if path and mtime
+    ]
+    local_config, *claude_data = await asyncio.gather(
+        load_config(),
+        *(_read_json(path) for _, path in sources),
+        return_exceptions=True,
+    )
+    if isinstance(local_config, BaseException):
+        logger.error(f"Failed to load MCP config: {local_config}")
+        local_config = {"servers": {}}
+    merged_servers = {}
     
-    for source, path in claude_paths.items():
-        if path:
-            try:
-                data = json.loads(path.read_text(encoding="utf-8-sig"))
-                mcp_servers_to_add = {}
-                
-                if source == "claude_code":
-                    # Global servers
-                    for k, v in data.get("mcpServers", {}).items():
-                        mcp_servers_to_add[k] = v
-                    # Project-specific servers
-                    for proj_path, proj_data in data.get("projects", {}).items():
-                        proj_name = Path(proj_path).name if proj_path else "unknown"
-                        for k, v in proj_data.get("mcpServers", {}).items():
-                            server_name = f"{k} [{proj_name}]"
-                            mcp_servers_to_add[server_name] = v
-                else:
-                    mcp_servers_to_add = data.get("mcpServers", {})
-                    
-                for name, srv_config in mcp_servers_to_add.items():
-                    # Adapt to OpenSRE format
-                    transport = "sse" if "url" in srv_config else "stdio"
-                    merged_servers[name] = {
-                        "command": srv_config.get("command", ""),
-                        "args": srv_config.get("args", []),
-                        "env": srv_config.get("env", {}),
-                        "url": srv_config.get("url", ""),
-                        "headers": srv_config.get("headers", {}),
-                        "transport": transport,
-                        "enabled": True,
-                        "description": f"Imported from {source.replace('_', ' ').title()}",
-                        "source": source
-                    }
-            except Exception as e:
-                logger.warning(f"Failed to load {source} config from {path}: {e}")
+    for (source, path), data in zip(sources, claude_data):
+        try:
+            if isinstance(data, BaseException):
+                raise data
+            mcp_servers_to_add = {}
+            
+            if source == "claude_code":
+                # Global servers
+                for k, v in data.get("mcpServers", {}).items():
+                    mcp_servers_to_add[k] = v
+                # Project-specific servers
+                for proj_path, proj_data in data.get("projects", {}).items():
+                    proj_name = Path(proj_path).name if proj_path else "unknown"
+                    for k, v in proj_data.get("mcpServers", {}).items():
+                        server_name = f"{k} [{proj_name}]"
+                        mcp_servers_to_add[server_name] = v
+            else:
+                mcp_servers_to_add = data.get("mcpServers", {})
                 
+            for name, srv_config in mcp_servers_to_add.items():
+                # Adapt to OpenSRE format
+                transport = "sse" if "url" in srv_config else "stdio"
+                merged_servers[name] = {
+                    "command": srv_config.get("command", ""),
+                    "args": srv_config.get("args", []),
+                    "env": srv_config.get("env", {}),
+                    "url": srv_config.get("url", ""),
+                    "headers": srv_config.get("headers", {}),
+                    "transport": transport,
+                    "enabled": True,
+                    "description": f"Imported from {source.replace('_', ' ').title()}",
+                    "source": source
+                }
+        except Exception as e:
+            logger.warning(f"Failed to load {source} config from {path}: {e}")
+            
     # 2. Add/Override with local config
     for name, srv_config in local_config.get("servers", {}).items():
         merged_servers[name] = srv_config
         
-    return {"servers": merged_servers}
+    result = {"servers": merged_servers}
+    _active_cache = (sig, result)
+    return copy.deepcopy(result)
 
 
-def save_config(data: dict[str, Any]) -> None:
+async def save_config(data: dict[str, Any]) -> None:
     """Save MCP server configurations to mcp_servers.json."""
     config_file = _get_config_file()
-    config_file.write_text(
-        json.dumps(data, indent=2, ensure_ascii=False) + "\n",
-        encoding="utf-8",
-    )
+    if orjson is not None:
+        raw = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    else:
+        raw = (json.dumps(data, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+    async with aiofiles.open(config_file, "wb") as f:
+        await f.write(raw)
+    invalidate_config_cache()
 
 
-def get_server(name: str) -> dict[str, Any] | None:
+async def get_server(name: str) -> dict[str, Any] | None:
     """Get a single server config by name."""
-    config = get_active_config()
+    config = await get_active_config()
     return config["servers"].get(name)
 
 
-def set_server(name: str, server_config: dict[str, Any]) -> None:
+async def set_server(name: str, server_config: dict[str, Any]) -> None:
     """Add or update a server config in local file."""
-    config = load_config()
+    config = await load_config()
     config["servers"][name] = server_config
-    save_config(config)
+    await save_config(config)
 
 
-def delete_server(name: str) -> bool:
+async def delete_server(name: str) -> bool:
     """Delete a server config from local file. Returns True if found and deleted."""
-    config = load_config()
+    config = await load_config()
     if name not in config["servers"]:
         return False
     del config["servers"][name]
-    save_config(config)
+    await save_config(config)
     return True
@@ -49,7 +49,7 @@ class MCPManager:
         使用 asyncio.gather 并行发起连接，各服务器相互隔离：
         任意一个挂起或失败都不会影响其他服务器的连接流程。
         """
-        config = get_active_config()
+        config = await get_active_config()
         servers = config.get("servers", {})
         enabled = [name for name, cfg in servers.items() if cfg.get("enabled", True)]
         if not enabled:
@@ -76,7 +76,7 @@ class MCPManager:
 
     async def initialize(self) -> None:
         """串行连接所有启用的 MCP 服务器（供 API 手动触发使用）。"""
-        config = get_active_config()
+        config = await get_active_config()
         servers = config.get("servers", {})
         for name, srv_config in servers.items():
             if srv_config.get("enabled", True):
@@ -124,7 +124,7 @@ class MCPManager:
             if name in self._connections and self._connections[name]["status"] == STATUS_CONNECTED:
                 await self._disconnect_server_unlocked(name)
 
-            srv_config = get_server(name)
+            srv_config = await get_server(name)
             if not srv_config:
                 raise ValueError(f"MCP server '{name}' not found in config")
 
@@ -288,9 +288,9 @@ class MCPManager:
                 tools.extend(conn["lc_tools"])
         return tools
 
-    def get_server_status(self) -> dict[str, dict[str, Any]]:
+    async def get_server_status(self) -> dict[str, dict[str, Any]]:
         """Return status info for all known servers."""
-        config = get_active_config()
+        config = await get_active_config()
         result = {}
         for name, srv_config in config.get("servers", {}).items():
             conn = self._connections.get(name, {})
@@ -99,6 +99,9 @@ class MemoryManager:
         # 并发写保护锁（read-modify-write 操作需持有此锁）
         self._lock = threading.Lock()
 
+        # 按 salience 降序排好的程序性记忆：(memory.json 签名 (mtime_ns, size), 条目列表)
+        self._procedural_sorted: Optional[tuple[tuple[int, int], list[dict]]] = None
+
         # 确保目录存在
         self.memory_dir.mkdir(parents=True, exist_ok=True)
         self.logs_dir.mkdir(parents=True, exist_ok=True)
@@ -174,10 +177,8 @@ class MemoryManager:
             with os.fdopen(fd, "w", encoding="utf-8") as f:
                 f.write(content)
 
-            # Windows 兼容：如果目标存在，先删除再重命名
-            if os.name == "nt" and self.memory_file.exists():
-                self.memory_file.unlink()
-            os.rename(tmp_path, self.memory_file)
+            # os.replace 在 POSIX 与 Windows 上均可原子覆盖已存在的目标文件
+            os.replace(tmp_path, self.memory_file)
         except Exception:
             # 清理临时文件
             try:
@@ -750,6 +751,23 @@ class MemoryManager:
 
         return entries
 
+    def get_top_procedural(self, n: int = 3) -> list[dict]:
+        """获取 salience 最高的 n 条程序性记忆。
+
+        排序结果按 memory.json 的 (mtime_ns, size) 缓存，文件未变化时不再重新加载与排序。
+        """
+        try:
+            st = self.memory_file.stat()
+            sig = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            sig = (0, 0)
+        cached = self._procedural_sorted
+        if cached is None or cached[0] != sig:
+            entries = self.get_procedural_memories()
+            entries.sort(key=lambda x: x.get("salience", 0), reverse=True)
+            cached = self._procedural_sorted = (sig, entries)
+        return [dict(e) for e in cached[1][:n]]
+
     def _invalidate_search_index(self) -> None:
         """通知搜索模块记忆索引已过期，下次搜索时懒加载重建"""
         try:
@@ -499,13 +499,12 @@ def get_implicit_recall(
     # 额外获取程序性记忆
     if include_procedural:
         from memory.manager import memory_manager
-        procedural = memory_manager.get_procedural_memories()
-        # 按 salience 排序，取 top 3
-        procedural.sort(key=lambda x: x.get("salience", 0), reverse=True)
+        # 按 salience 取 top 3（排序结果由 memory_manager 按文件版本缓存）
+        procedural = memory_manager.get_top_procedural(3)
 
         # 基于内容前缀去重（日志型结果可能没有 id 字段，字段名也不统一）
         existing_contents = {r.get("content", "")[:100] for r in results}
-        for p in procedural[:3]:
+        for p in procedural:
             p_content = p.get("content", "")
             if p_content[:100] not in existing_contents:
                 results.append({
@@ -11,6 +11,7 @@ import os
 import tempfile
 import threading
 import uuid
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -117,6 +118,7 @@ def save_pool(pool: dict) -> None:
         tmp_path = None  # 标记已处理，防止 finally 中重复删除
 
         _pool_cache = pool
+        resolve_model_name.cache_clear()
         logger.info("Model pool saved successfully")
 
     except Exception as e:
@@ -220,6 +222,7 @@ def invalidate_cache() -> None:
     """Clear in-memory pool cache, forcing a re-read from disk."""
     global _pool_cache
     _pool_cache = None
+    resolve_model_name.cache_clear()
 
 
 def list_models() -> list[dict]:
@@ -373,3 +376,13 @@ def resolve_model(scenario: str) -> dict:
         }
     else:
         raise ValueError(f"Unknown scenario: {scenario}")
+
+
+@lru_cache(maxsize=4)
+def resolve_model_name(scenario: str = "llm") -> str:
+    """Resolve only the model name for a scenario (cached).
+
+    流式事件每次 LLM 调用都需要模型名，缓存避免重复深拷贝模型池。
+    模型池保存 / invalidate_cache / 引擎 invalidate_llm_cache 时清除。
+    """
+    return resolve_model(scenario).get("model", "unknown")
@@ -1,7 +1,11 @@
 """System Prompt Builder - Dynamically assembles the system prompt from workspace files."""
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
+import hashlib
 import logging
+import os
 import platform
 from xml.sax.saxutils import escape as xml_escape
 
@@ -9,15 +13,43 @@ from config import settings, PROJECT_ROOT, read_text_smart
 
 logger = logging.getLogger(__name__)
 
+# 构建 System Prompt 时并发读取各组成部分（技能快照、工作区文件、记忆）的线程池
+_read_pool = ThreadPoolExecutor(max_workers=6, thread_name_prefix="prompt-read")
+
+# 隐式召回结果缓存 TTL（秒）：键中已含记忆文件指纹，TTL 仅限制时间衰减评分的漂移
+_RECALL_CACHE_TTL = 3600
+_recall_cache = None
+
+# 隐式召回条目：内容截断长度与加星（⭐）的重要性阈值
+_RECALL_CONTENT_CHARS = 200
+_HIGH_SALIENCE = 0.8
+
+
+def _file_key(path: Path) -> Optional[tuple[str, int, int]]:
+    """文件缓存键 (path, mtime_ns, size)，文件不存在时返回 None。"""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=64)
+def _read_text_cached(path_str: str, mtime_ns: int, size: int, max_chars: Optional[int]) -> str:
+    """按 (path, mtime_ns, size, max_chars) 缓存的（截断后）文件内容，文件未变化时跳过读取、解码与截断。"""
+    content = read_text_smart(Path(path_str))
+    if max_chars and len(content) > max_chars:
+        # 仅超长时才分配截断后的新字符串
+        return f"{content[:max_chars]}\n\n...[truncated]"
+    return content
+
 
 def _read_file_safe(path: Path, max_chars: Optional[int] = None) -> str:
     """安全读取文件，自动处理编码，找不到时返回空字符串。"""
-    if not path.exists():
+    key = _file_key(path)
+    if key is None:
         return ""
-    content = read_text_smart(path)
-    if max_chars and len(content) > max_chars:
-        content = content[:max_chars] + "\n\n...[truncated]"
-    return content
+    return _read_text_cached(*key, max_chars)
 
 
 def _detect_os_description() -> str:
@@ -67,28 +99,27 @@ def _detect_os_description() -> str:
 
 def generate_skills_snapshot() -> str:
     """Scan skills directory and generate SKILLS_SNAPSHOT content."""
-    skills_dirs = [settings.skills_dir]
-
-    # Claude Code Skills compatibility
-    claude_code_dir = _detect_claude_code_skills()
-    if claude_code_dir:
-        skills_dirs.append(claude_code_dir)
+    skills_dirs = get_skills_dirs()
 
     data_path = settings.get_data_path()
-    skills_xml = "<available_skills>\n"
+    frags = ["<available_skills>\n"]
     for base_dir in skills_dirs:
-        if not base_dir.exists():
+        # os.scandir 的 DirEntry 自带类型信息，is_dir 无需额外 stat（符号链接除外）
+        try:
+            with os.scandir(base_dir) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
             continue
-        for skill_dir in sorted(base_dir.iterdir()):
-            if not skill_dir.is_dir():
+        for entry in entries:
+            if not entry.is_dir():
                 continue
-            skill_md = skill_dir / "SKILL.md"
-            if not skill_md.exists():
+            skill_md = Path(entry.path) / "SKILL.md"
+            if not os.path.isfile(skill_md):
                 continue
             # Parse frontmatter for name and description
             name, description = _parse_skill_frontmatter(skill_md)
             if not name:
-                name = skill_dir.name
+                name = entry.name
             # Use relative path from data_dir first, fallback to PROJECT_ROOT
             try:
                 rel_path = skill_md.relative_to(data_path)
@@ -102,22 +133,36 @@ def generate_skills_snapshot() -> str:
             safe_name = xml_escape(name)
             safe_desc = xml_escape(description)
             safe_loc = xml_escape(str(rel_path))
-            skills_xml += f"  <skill>\n"
-            skills_xml += f"    <name>{safe_name}</name>\n"
-            skills_xml += f"    <description>{safe_desc}</description>\n"
-            skills_xml += f"    <location>./{safe_loc}</location>\n"
-            skills_xml += f"  </skill>\n"
+            frags.append(
+                f"  <skill>\n"
+                f"    <name>{safe_name}</name>\n"
+                f"    <description>{safe_desc}</description>\n"
+                f"    <location>./{safe_loc}</location>\n"
+                f"  </skill>\n"
+            )
 
-    skills_xml += "</available_skills>"
-    return skills_xml
+    frags.append("</available_skills>")
+    return "".join(frags)
 
 
 def _parse_skill_frontmatter(skill_md: Path) -> tuple[str, str]:
-    """解析 SKILL.md 的 YAML frontmatter，自动处理文件编码。"""
+    """解析 SKILL.md 的 YAML frontmatter，自动处理文件编码。
+
+    结果按 (path, mtime_ns, size) 缓存，未修改的技能文件不再重复读取和解析。
+    """
+    key = _file_key(skill_md)
+    if key is None:
+        return "", ""
+    return _parse_frontmatter_cached(*key)
+
+
+@lru_cache(maxsize=256)
+def _parse_frontmatter_cached(path_str: str, mtime_ns: int, size: int) -> tuple[str, str]:
+    """_parse_skill_frontmatter 的缓存实现（mtime_ns / size 仅作为缓存键）。"""
     try:
         import frontmatter
         # 用 read_text_smart 处理编码后，再解析 frontmatter
-        content = read_text_smart(skill_md)
+        content = read_text_smart(Path(path_str))
         post = frontmatter.loads(content)
         name = post.get("name", "")
         description = post.get("description", "")
@@ -126,8 +171,24 @@ def _parse_skill_frontmatter(skill_md: Path) -> tuple[str, str]:
         return "", ""
 
 
+def get_skills_dirs() -> list[Path]:
+    """SKILLS_SNAPSHOT 扫描的技能目录列表（prompt 缓存据此计算文件指纹）。"""
+    skills_dirs = [settings.skills_dir]
+    # Claude Code Skills compatibility
+    claude_code_dir = _detect_claude_code_skills()
+    if claude_code_dir:
+        skills_dirs.append(claude_code_dir)
+    return skills_dirs
+
+
 def _detect_claude_code_skills() -> Optional[Path]:
     """Detect Claude Code skills directory if installed."""
+    return _find_claude_code_skills_dir(settings.claude_code_skills_dir)
+
+
+@lru_cache(maxsize=1)
+def _find_claude_code_skills_dir(configured_dir: Optional[Path]) -> Optional[Path]:
+    """查找 Claude Code 技能目录（按配置项缓存，进程内只探测一次；测试可调用 cache_clear()）。"""
     # Common Claude Code skills locations
     home = Path.home()
     possible_paths = [
@@ -136,8 +197,8 @@ def _detect_claude_code_skills() -> Optional[Path]:
         home / "AppData" / "Roaming" / "claude" / "skills",  # Windows
     ]
     # Also check from settings
-    if settings.claude_code_skills_dir:
-        possible_paths.insert(0, settings.claude_code_skills_dir)
+    if configured_dir:
+        possible_paths.insert(0, configured_dir)
 
     for p in possible_paths:
         if p.exists() and p.is_dir():
@@ -155,10 +216,12 @@ def build_system_prompt() -> str:
     5. AGENTS.md (行为准则 & 记忆操作指南)
     6. memory.json (长期记忆) + Daily Logs
     """
-    # Check cache first
+    # Check cache first（缓存键在构建前只取一次，命中检查与写入使用同一个键）
+    cache_key: Optional[str] = None
     try:
         from cache import prompt_cache
-        cached = prompt_cache.get_cached_prompt()
+        cache_key = prompt_cache.get_cache_key()
+        cached = prompt_cache.get_cached_prompt(cache_key)
         if cached is not None:
             logger.debug("✓ Using cached system prompt")
             return cached
@@ -168,31 +231,25 @@ def build_system_prompt() -> str:
     max_chars = settings.max_prompt_chars
     workspace = settings.workspace_dir
 
+    # 各组成部分的读取相互独立：并发提交，再按原顺序拼接（冷启动耗时趋近于最慢的一项）
+    skills_future = _read_pool.submit(generate_skills_snapshot)
+    file_futures = [
+        (tag, _read_pool.submit(_read_file_safe, workspace / f"{tag}.md", max_chars))
+        for tag in ("SOUL", "IDENTITY", "USER", "AGENTS")
+    ]
+    memory_future = _read_pool.submit(_load_long_term_memory)
+    daily_future = _read_pool.submit(_load_daily_context)
+
     parts: list[str] = []
 
     # 1. Skills Snapshot
-    skills = generate_skills_snapshot()
-    parts.append(f"<!-- SKILLS_SNAPSHOT -->\n{skills}")
-
-    # 2. SOUL.md
-    soul = _read_file_safe(workspace / "SOUL.md", max_chars)
-    if soul:
-        parts.append(f"<!-- SOUL -->\n{soul}")
+    parts.append(f"<!-- SKILLS_SNAPSHOT -->\n{skills_future.result()}")
 
-    # 3. IDENTITY.md
-    identity = _read_file_safe(workspace / "IDENTITY.md", max_chars)
-    if identity:
-        parts.append(f"<!-- IDENTITY -->\n{identity}")
-
-    # 4. USER.md
-    user = _read_file_safe(workspace / "USER.md", max_chars)
-    if user:
-        parts.append(f"<!-- USER -->\n{user}")
-
-    # 5. AGENTS.md
-    agents = _read_file_safe(workspace / "AGENTS.md", max_chars)
-    if agents:
-        parts.append(f"<!-- AGENTS -->\n{agents}")
+    # 2-5. SOUL.md / IDENTITY.md / USER.md / AGENTS.md
+    for tag, future in file_futures:
+        content = future.result()
+        if content:
+            parts.append(f"<!-- {tag} -->\n{content}")
 
     # 5.5 Workspace Info（包含动态占位符 {{SESSION_ID}} 和 {{WORKING_DIR}}，由 runner 替换）
     data_path = settings.get_data_path()
@@ -218,36 +275,37 @@ def build_system_prompt() -> str:
     memory_sections: list[str] = []
 
     # 长期记忆（memory.json：含用户偏好、事实、程序经验等所有分类）
-    try:
-        from memory.manager import memory_manager
-        memory_content = memory_manager.read_memory()
-        if memory_content:
-            memory_sections.append(memory_content)
-    except Exception as e:
-        logger.warning(f"加载 memory.json 失败: {e}")
+    memory_content = memory_future.result()
+    if memory_content:
+        memory_sections.append(memory_content)
 
     # 每日日志
-    try:
-        from memory.manager import memory_manager
-        daily_context = memory_manager.get_daily_context()
-        if daily_context:
-            memory_sections.append(f"## 每日日志\n{daily_context}")
-    except Exception as e:
-        logger.warning(f"加载每日日志失败: {e}")
+    daily_context = daily_future.result()
+    if daily_context:
+        memory_sections.append(f"## 每日日志\n{daily_context}")
 
-    # 合并并应用 token 预算
+    # 合并并应用 token 预算：边累加边检查长度，超出预算时只截取所需部分，不先拼出完整字符串
     if memory_sections:
-        memory_combined = "<!-- MEMORY -->\n" + "\n\n".join(memory_sections)
-        if len(memory_combined) > memory_budget:
-            memory_combined = memory_combined[:memory_budget] + "\n\n...[memory truncated]"
-        parts.append(memory_combined)
+        pieces = ["<!-- MEMORY -->\n", memory_sections[0]]
+        for section in memory_sections[1:]:
+            pieces += ("\n\n", section)
+        frags: list[str] = []
+        used = 0
+        for piece in pieces:
+            if used + len(piece) > memory_budget:
+                frags.append(piece[:memory_budget - used])
+                frags.append("\n\n...[memory truncated]")
+                break
+            frags.append(piece)
+            used += len(piece)
+        parts.append("".join(frags))
 
     full_prompt = "\n\n---\n\n".join(parts)
 
     # Cache the result
     try:
         from cache import prompt_cache
-        prompt_cache.cache_prompt(full_prompt)
+        prompt_cache.cache_prompt(full_prompt, cache_key)
         logger.debug("✓ System prompt cached")
     except Exception as e:
         logger.warning(f"Failed to cache prompt: {e}")
@@ -255,6 +313,26 @@ def build_system_prompt() -> str:
     return full_prompt
 
 
+def _load_long_term_memory() -> str:
+    """读取长期记忆（memory.json），失败时记录警告并返回空字符串。"""
+    try:
+        from memory.manager import memory_manager
+        return memory_manager.read_memory()
+    except Exception as e:
+        logger.warning(f"加载 memory.json 失败: {e}")
+        return ""
+
+
+def _load_daily_context() -> str:
+    """读取近期每日日志，失败时记录警告并返回空字符串。"""
+    try:
+        from memory.manager import memory_manager
+        return memory_manager.get_daily_context()
+    except Exception as e:
+        logger.warning(f"加载每日日志失败: {e}")
+        return ""
+
+
 def build_implicit_recall_context(user_message: str) -> tuple[str, list[dict]]:
     """基于用户首条消息构建隐式召回上下文
 
@@ -277,6 +355,14 @@ def build_implicit_recall_context(user_message: str) -> tuple[str, list[dict]]:
 
         top_k = settings.memory_implicit_recall_top_k
         mode = getattr(settings, "memory_implicit_recall_mode", "keyword")
+
+        # 相同查询 + 记忆未变化时直接复用上次召回结果，跳过 embedding / 检索
+        recall_cache = _get_recall_cache()
+        cache_key = _recall_cache_key(user_message, top_k, mode)
+        cached = recall_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("✓ Using cached implicit recall")
+            return cached[0], list(cached[1])
         # 不包含 procedural，因为程序经验已在 read_memory() 的 "## 程序经验" 中展示
         results = get_implicit_recall(
             query=user_message,
@@ -286,21 +372,25 @@ def build_implicit_recall_context(user_message: str) -> tuple[str, list[dict]]:
         )
 
         if not results:
+            recall_cache.set(cache_key, ("", []))
             return "", []
 
         # 过滤掉可能从语义搜索路径进来的 procedural 条目
         results = [r for r in results if r.get("category") != "procedural"]
         if not results:
+            recall_cache.set(cache_key, ("", []))
             return "", []
 
         parts = ["## 相关记忆（自动召回）\n"]
         # 构建简要条目列表，供 debug 面板展示
         recall_items = []
         for r in results[:top_k]:
-            content = r.get("content", "")[:200]
+            content = r.get("content", "")
+            if len(content) > _RECALL_CONTENT_CHARS:
+                content = content[:_RECALL_CONTENT_CHARS]
             cat = r.get("category", "")
             salience = r.get("salience", 0.5)
-            star = "⭐ " if salience >= 0.8 else ""
+            star = "⭐ " if salience >= _HIGH_SALIENCE else ""
             parts.append(f"- {star}[{cat}] {content}")
             recall_items.append({
                 "content": content,
@@ -308,8 +398,47 @@ def build_implicit_recall_context(user_message: str) -> tuple[str, list[dict]]:
                 "salience": salience,
             })
 
-        return "\n".join(parts), recall_items
+        context = "\n".join(parts)
+        recall_cache.set(cache_key, (context, recall_items))
+        return context, list(recall_items)
 
     except Exception as e:
         logger.warning(f"Failed to build implicit recall context: {e}")
         return "", []
+
+
+def _get_recall_cache():
+    """获取隐式召回结果缓存（首次调用时创建）。"""
+    global _recall_cache
+    if _recall_cache is None:
+        from cache.memory_cache import MemoryCache
+        _recall_cache = MemoryCache(
+            max_size=settings.cache_max_memory_items,
+            default_ttl=_RECALL_CACHE_TTL,
+        )
+    return _recall_cache
+
+
+def _recall_cache_key(user_message: str, top_k: int, mode: str) -> str:
+    """隐式召回缓存键：SHA256(归一化查询 + 召回参数 + 记忆文件指纹)。
+
+    查询按关键词检索的方式归一化（小写、折叠空白）；
+    指纹覆盖 memory.json 与每日日志的 (mtime_ns, size)，任一记忆写入后自动失效。
+    """
+    h = hashlib.sha256()
+    h.update(f"{mode}|{top_k}|{' '.join(user_message.lower().split())}".encode("utf-8"))
+    mem_file = settings.memory_dir / "memory.json"
+    logs_dir = settings.memory_dir / "logs"
+    try:
+        st = mem_file.stat()
+        h.update(f"|{st.st_mtime_ns}:{st.st_size}".encode())
+    except OSError:
+        pass
+    try:
+        with os.scandir(logs_dir) as it:
+            for entry in sorted(it, key=lambda e: e.name):
+                st = entry.stat()
+                h.update(f"|{entry.name}:{st.st_mtime_ns}:{st.st_size}".encode("utf-8"))
+    except OSError:
+        pass
+    return h.hexdigest()
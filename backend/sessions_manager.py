@@ -3,20 +3,103 @@
 并发安全增强：
 - 使用 threading.Lock 保护并发读写操作
 - 使用原子写入模式（write-to-temp-then-rename）防止数据损坏
+
+性能：解码后的会话数据按文件 (mtime_ns, size) 缓存，文件未变化时读改写无需重新解析 JSON。
 """
 import json
 import logging
 import os
 import tempfile
 import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时回退到标准库 json
+    orjson = None
+
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+# 会话数据缓存最多保留的会话数（LRU）
+_SESSION_CACHE_MAX = 32
+
+
+def _empty_session() -> dict:
+    return {"messages": [], "title": None, "plan": None}
+
+
+def _clone(obj):
+    """复制 JSON 结构的嵌套 dict / list（会话数据仅含 JSON 类型，无需 copy.deepcopy 的 memo 开销）。"""
+    if isinstance(obj, dict):
+        return {k: _clone(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_clone(v) for v in obj]
+    return obj
+
+
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    """序列化为 UTF-8 JSON 字节。优先 orjson，其不支持的对象回退到标准库 json。"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0))
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def _json_loads(data: bytes):
+    """解析 JSON 字节，优先使用 orjson。"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# 元数据侧车必须包含的字段
+_META_KEYS = frozenset({"title", "message_count", "preview"})
+
+
+def _build_meta(session_data: dict) -> dict:
+    """从完整会话数据计算 list_sessions 所需的元数据。"""
+    messages = session_data.get("messages", [])
+    preview = ""
+    # Get last user message as preview
+    for msg in reversed(messages):
+        if msg.get("role") == "user":
+            preview = msg.get("content", "")[:100]
+            break
+    return {
+        "title": session_data.get("title", None),
+        "message_count": len(messages),
+        "preview": preview,
+    }
+
+
+# 最近一次格式化的 (整秒, "YYYY-MM-DDTHH:MM:SS" 前缀)：同一秒内的消息复用，只拼接微秒部分
+_ts_prefix: tuple[int, str] = (-1, "")
+
+
+def _fmt_ts(ns: int) -> str:
+    """将 epoch 纳秒格式化为本地时间 ISO 字符串（与 datetime.now().isoformat() 格式一致）。"""
+    global _ts_prefix
+    sec, rem = divmod(ns, 1_000_000_000)
+    cached_sec, prefix = _ts_prefix
+    if sec != cached_sec:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(sec))
+        _ts_prefix = (sec, prefix)
+    us = rem // 1000
+    return f"{prefix}.{us:06d}" if us else prefix
+
+
+def _get_ts(call: dict) -> str:
+    """debug 调用的排序键（缺少时间戳的排在最前）。"""
+    return call.get("timestamp") or "1970-01-01T00:00:00"
+
 
 class SessionManager:
     """Manages conversation sessions stored as JSON files.
@@ -29,6 +112,8 @@ class SessionManager:
         self.sessions_dir.mkdir(parents=True, exist_ok=True)
         # 并发写保护锁
         self._lock = threading.Lock()
+        # 会话数据缓存：path → ((mtime_ns, size), session_data)
+        self._cache: OrderedDict[Path, tuple[tuple[int, int], dict]] = OrderedDict()
 
     def _session_path(self, session_id: str) -> Path:
         """Get the file path for a session."""
@@ -36,72 +121,126 @@ class SessionManager:
         safe_id = "".join(c for c in session_id if c.isalnum() or c in "_-")
         return self.sessions_dir / f"{safe_id}.json"
 
+    def _debug_path(self, session_id: str) -> Path:
+        """Get the append-only debug calls log path for a session."""
+        return self._session_path(session_id).with_suffix(".debug.jsonl")
+
+    def _meta_path(self, session_id: str) -> Path:
+        """Get the metadata sidecar path for a session (title / count / preview)."""
+        return self._session_path(session_id).with_suffix(".meta.json")
+
     def list_sessions(self) -> list[dict]:
-        """List all available sessions with metadata."""
-        sessions = []
-        for f in sorted(self.sessions_dir.glob("*.json"), key=lambda x: x.stat().st_mtime, reverse=True):
-            try:
-                data = json.loads(f.read_text(encoding="utf-8"))
+        """List all available sessions with metadata.
 
-                # Support both old format (list) and new format (dict with metadata)
-                if isinstance(data, list):
-                    messages = data
-                    title = None
-                else:
-                    messages = data.get("messages", [])
-                    title = data.get("title", None)
+        优先读取 <session>.meta.json 侧车文件（仅几百字节），不解析完整会话；
+        侧车缺失或早于会话文件（旧会话 / 外部修改）时从完整文件重建一次。
+        """
+        # 单次 scandir 并为每个会话文件只 stat 一次，排序与 updated_at 复用同一结果
+        entries = []
+        try:
+            with os.scandir(self.sessions_dir) as it:
+                for entry in it:
+                    name = entry.name
+                    if not name.endswith(".json") or name.endswith(".meta.json"):
+                        continue
+                    try:
+                        entries.append((entry, entry.stat()))
+                    except OSError:
+                        pass  # 扫描期间被删除
+        except OSError as e:
+            logger.warning(f"Error listing sessions: {e}")
+        entries.sort(key=lambda es: es[1].st_mtime, reverse=True)
 
-                # Extract metadata
+        sessions = []
+        for entry, st in entries:
+            f = Path(entry.path)
+            try:
                 session_id = f.stem
-                msg_count = len(messages)
-                last_message = ""
-                updated_at = datetime.fromtimestamp(f.stat().st_mtime).isoformat()
-
-                # Get last user message as preview
-                for msg in reversed(messages):
-                    if msg.get("role") == "user":
-                        last_message = msg.get("content", "")[:100]
-                        break
+                meta = self._read_meta(f.with_suffix(".meta.json"), st.st_mtime_ns)
+                if meta is None:
+                    data = _json_loads(f.read_bytes())
+                    # Support both old format (list) and new format (dict with metadata)
+                    if isinstance(data, list):
+                        data = {"messages": data, "title": None}
+                    meta = _build_meta(data)
+                    self._write_meta(session_id, meta)
 
                 sessions.append({
                     "session_id": session_id,
-                    "message_count": msg_count,
-                    "title": title,  # New field
-                    "preview": last_message,
-                    "updated_at": updated_at,
+                    "message_count": meta["message_count"],
+                    "title": meta["title"],  # New field
+                    "preview": meta["preview"],
+                    "updated_at": datetime.fromtimestamp(st.st_mtime).isoformat(),
                 })
             except Exception as e:
                 logger.warning(f"Error reading session {f}: {e}")
 
         return sessions
 
-    def get_session(self, session_id: str) -> list[dict]:
-        """Get all messages for a session."""
-        path = self._session_path(session_id)
-        if not path.exists():
-            return []
+    @staticmethod
+    def _read_meta(meta_path: Path, session_mtime_ns: int) -> Optional[dict]:
+        """读取元数据侧车，不存在、损坏或早于会话文件时返回 None。"""
         try:
-            data = json.loads(path.read_text(encoding="utf-8"))
-            if isinstance(data, list):
-                return data
-            return data.get("messages", [])
+            if meta_path.stat().st_mtime_ns < session_mtime_ns:
+                return None
+            meta = _json_loads(meta_path.read_bytes())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(meta, dict) or not _META_KEYS <= meta.keys():
+            return None
+        return meta
+
+    def _write_meta(self, session_id: str, meta: dict) -> None:
+        """原子写入元数据侧车；失败只记录日志（list_sessions 会按需重建）。"""
+        try:
+            self._atomic_write(self._meta_path(session_id), _json_dumps(meta), session_id)
         except Exception as e:
-            logger.error(f"Error reading session {session_id}: {e}")
-            return []
+            logger.warning(f"Failed to write session meta {session_id}: {e}")
 
-    def get_session_data(self, session_id: str) -> dict:
-        """Get full session data including metadata."""
+    def _load_session_data(self, session_id: str) -> dict:
+        """读取会话数据，文件 (mtime_ns, size) 未变化时直接返回缓存。
+
+        必须在持有 self._lock 时调用（缓存的查找 / 淘汰不是原子操作）。
+        返回的是缓存中的对象本身：仅供持锁的读改写路径使用，对外接口需在锁内返回深副本。
+        """
         path = self._session_path(session_id)
-        if not path.exists():
-            return {"messages": [], "title": None, "plan": None}
         try:
-            data = json.loads(path.read_text(encoding="utf-8"))
-            if isinstance(data, list):
-                return {"messages": data, "title": None, "plan": None}
-            return data
+            st = path.stat()
+        except OSError:
+            self._cache.pop(path, None)
+            return _empty_session()
+        sig = (st.st_mtime_ns, st.st_size)
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == sig:
+            self._cache.move_to_end(path)
+            return cached[1]
+        try:
+            data = _json_loads(path.read_bytes())
         except Exception as e:
             logger.error(f"Error reading session {session_id}: {e}")
-            return {"messages": [], "title": None, "plan": None}
+            return _empty_session()
+        # Support both old format (list) and new format (dict with metadata)
+        if isinstance(data, list):
+            data = {"messages": data, "title": None, "plan": None}
+        self._cache_put(path, sig, data)
+        return data
+
+    def _cache_put(self, path: Path, sig: tuple[int, int], data: dict) -> None:
+        """写入会话缓存，超出容量时淘汰最久未使用的会话。"""
+        self._cache[path] = (sig, data)
+        self._cache.move_to_end(path)
+        while len(self._cache) > _SESSION_CACHE_MAX:
+            self._cache.popitem(last=False)
+
+    def get_session(self, session_id: str) -> list[dict]:
+        """Get all messages for a session."""
+        with self._lock:
+            return _clone(self._load_session_data(session_id).get("messages", []))
+
+    def get_session_data(self, session_id: str) -> dict:
+        """Get full session data including metadata."""
+        with self._lock:
+            return _clone(self._load_session_data(session_id))
 
     def save_message(self, session_id: str, role: str, content: str,
                      tool_calls: Optional[list] = None,
@@ -110,21 +249,20 @@ class SessionManager:
         """Append a message to a session.
 
         线程安全：使用锁保护 read-modify-write 操作。
+        消息直接追加到缓存中的会话数据（就地修改，不复制消息列表），只需一次序列化写入。
         """
         with self._lock:
-            session_data = self.get_session_data(session_id)
-            messages = session_data.get("messages", [])
+            session_data = self._load_session_data(session_id)
             message: dict = {
                 "role": role,
                 "content": content,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": _fmt_ts(time.time_ns()),
             }
             if tool_calls:
                 message["tool_calls"] = tool_calls
             if segments:
                 message["segments"] = segments
-            messages.append(message)
-            session_data["messages"] = messages
+            session_data.setdefault("messages", []).append(message)
             # Save plan if provided (from assistant message)
             if plan:
                 session_data["plan"] = plan
@@ -135,46 +273,63 @@ class SessionManager:
         if not session_id:
             session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         path = self._session_path(session_id)
-        if not path.exists():
-            self._write_session_data(session_id, {"messages": [], "title": None, "plan": None})
+        with self._lock:
+            if not path.exists():
+                self._write_session_data(session_id, {"messages": [], "title": None, "plan": None})
         return session_id
 
     def delete_session(self, session_id: str) -> bool:
         """Delete a session."""
         path = self._session_path(session_id)
-        if path.exists():
-            path.unlink()
-            return True
-        return False
+        with self._lock:
+            self._cache.pop(path, None)
+            self._debug_path(session_id).unlink(missing_ok=True)
+            self._meta_path(session_id).unlink(missing_ok=True)
+            if path.exists():
+                path.unlink()
+                return True
+            return False
 
     def _write_session(self, session_id: str, messages: list[dict]) -> None:
         """Write messages to a session file (legacy format)."""
-        self._write_session_data(session_id, {"messages": messages, "title": None, "plan": None})
+        with self._lock:
+            self._write_session_data(session_id, {"messages": messages, "title": None, "plan": None})
 
     def _write_session_data(self, session_id: str, session_data: dict) -> None:
         """Write full session data including metadata.
 
-        使用原子写入模式：先写临时文件，再 rename 覆盖目标文件。
+        使用原子写入模式：先写临时文件，再 os.replace 覆盖目标文件。
         这确保进程崩溃时文件要么是旧的完整版本，要么是新的完整版本，不会出现半写入状态。
         """
         path = self._session_path(session_id)
-        content = json.dumps(session_data, ensure_ascii=False, indent=2)
+        content = _json_dumps(session_data, indent=True)
 
-        # 原子写入：先写临时文件，再 rename
-        # Windows 上 rename 不能覆盖已存在文件，需要先删除
+        try:
+            self._atomic_write(path, content, session_id)
+        except Exception:
+            # 缓存中可能是未落盘的修改，一并丢弃
+            self._cache.pop(path, None)
+            raise
+
+        # 写入成功：以新文件签名缓存刚写入的数据，下次读改写无需重新解码
+        st = path.stat()
+        self._cache_put(path, (st.st_mtime_ns, st.st_size), session_data)
+        # 会话文件之后写入元数据侧车，保证其 mtime 不早于会话文件
+        self._write_meta(session_id, _build_meta(session_data))
+
+    def _atomic_write(self, path: Path, content: bytes, session_id: str) -> None:
+        """原子写入：先写临时文件，再 os.replace 覆盖目标文件。"""
         fd, tmp_path = tempfile.mkstemp(
             suffix=".tmp",
             prefix=f"session_{session_id}_",
             dir=str(self.sessions_dir)
         )
         try:
-            with os.fdopen(fd, "w", encoding="utf-8") as f:
+            with os.fdopen(fd, "wb") as f:
                 f.write(content)
 
-            # Windows 兼容：如果目标存在，先删除再重命名
-            if os.name == "nt" and path.exists():
-                path.unlink()
-            os.rename(tmp_path, path)
+            # os.replace 在 POSIX 与 Windows 上均可原子覆盖已存在的目标文件
+            os.replace(tmp_path, path)
         except Exception:
             # 清理临时文件
             try:
@@ -186,47 +341,69 @@ class SessionManager:
     def set_title(self, session_id: str, title: str) -> None:
         """Set the title for a session."""
         with self._lock:
-            session_data = self.get_session_data(session_id)
+            session_data = self._load_session_data(session_id)
             session_data["title"] = title
             self._write_session_data(session_id, session_data)
 
     def save_debug_calls(self, session_id: str, debug_calls: list[dict]) -> None:
-        """Save debug calls (LLM/tool traces) to the session."""
+        """Save debug calls (LLM/tool traces) to the session.
+
+        追加写入 <session>.debug.jsonl（每行一条），不读取、不排序、不重写会话文件。
+        旧会话文件中内嵌的 debug_calls 在首次追加时迁移到 jsonl。
+        """
         if not debug_calls:
             return
         with self._lock:
-            session_data = self.get_session_data(session_id)
-            existing = session_data.get("debug_calls", [])
-            existing.extend(debug_calls)
-
-            # 确保按时间戳升序排序，防止在不同模块 (如 app.py 和 middleware) 异步保存时顺序错乱
-            def _get_ts(call):
-                ts = call.get("timestamp")
-                if not ts:
-                    return "1970-01-01T00:00:00"
-                return ts
-
-            existing.sort(key=_get_ts)
-
-            session_data["debug_calls"] = existing
-            self._write_session_data(session_id, session_data)
+            session_data = self._load_session_data(session_id)
+            legacy = session_data.get("debug_calls")
+            content = b"".join(
+                _json_dumps(call) + b"\n"
+                for call in (*(legacy or ()), *debug_calls)
+            )
+            with open(self._debug_path(session_id), "ab+") as f:
+                # 上次写入被中断留下半行时先补换行，避免与新记录粘连
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        content = b"\n" + content
+                f.write(content)
+            if legacy is not None:
+                del session_data["debug_calls"]
+                self._write_session_data(session_id, session_data)
 
     def get_debug_calls(self, session_id: str) -> list[dict]:
-        """Get debug calls for a session."""
-        session_data = self.get_session_data(session_id)
-        return session_data.get("debug_calls", [])
+        """Get debug calls for a session.
+
+        按时间戳升序返回，防止在不同模块 (如 app.py 和 middleware) 异步保存时顺序错乱。
+        """
+        with self._lock:
+            calls = _clone(self._load_session_data(session_id).get("debug_calls", []))
+        try:
+            with open(self._debug_path(session_id), "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        calls.append(_json_loads(line))
+                    except ValueError:
+                        # 进程崩溃可能留下半行，跳过
+                        logger.warning(f"Skipping corrupt debug call line in session {session_id}")
+        except FileNotFoundError:
+            pass
+        calls.sort(key=_get_ts)
+        return calls
 
     def save_plan(self, session_id: str, plan: dict | None) -> None:
         """Save plan data to the session."""
         with self._lock:
-            session_data = self.get_session_data(session_id)
+            session_data = self._load_session_data(session_id)
             session_data["plan"] = plan
             self._write_session_data(session_id, session_data)
 
     def get_plan(self, session_id: str) -> dict | None:
         """Get plan data for a session."""
-        session_data = self.get_session_data(session_id)
-        return session_data.get("plan")
+        with self._lock:
+            return _clone(self._load_session_data(session_id).get("plan"))
 
 
 # Singleton instance
@@ -13,6 +13,9 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+# 格式化输出的最大字符数（超出后不再格式化剩余条目）
+_MAX_OUTPUT_CHARS = 4000
+
 
 @tool
 def memory_search(query: str, top_k: int = 5, use_decay: bool = True, category: Optional[str] = None) -> str:
@@ -54,7 +57,11 @@ def memory_search(query: str, top_k: int = 5, use_decay: bool = True, category:
             return f"未找到与 '{query}' 相关的记忆。"
 
         formatted = []
+        length = 0
         for r in results:
+            if length > _MAX_OUTPUT_CHARS:
+                formatted.append(f"...[其余 {len(results) - len(formatted)} 条已省略]")
+                break
             source = r.get("source", "unknown")
             score = r.get("score", 0)
             salience = r.get("salience", 0.5)
@@ -64,9 +71,9 @@ def memory_search(query: str, top_k: int = 5, use_decay: bool = True, category:
             # 构建结果行
             cat_str = f" [{cat}]" if cat else ""
             salience_str = f" ⭐" if salience >= 0.8 else ""
-            formatted.append(
-                f"📝 [{source}]{cat_str}{salience_str} (相关度: {score:.2f})\n{content}"
-            )
+            item = f"📝 [{source}]{cat_str}{salience_str} (相关度: {score:.2f})\n{content}"
+            formatted.append(item)
+            length += len(item)
 
         return f"找到 {len(results)} 条相关记忆:\n\n" + "\n\n---\n\n".join(formatted)
 
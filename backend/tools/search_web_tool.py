@@ -1,10 +1,48 @@
 """Search Web Tool - DuckDuckGo 搜索工具，用于获取互联网实时信息。"""
+import hashlib
 import logging
+import threading
+
 from langchain_core.tools import tool
 from ddgs import DDGS
 
 logger = logging.getLogger(__name__)
 
+# 搜索结果输出的最大字符数
+_MAX_OUTPUT_CHARS = 4000
+
+
+def _search_cache_key(query: str) -> str:
+    """搜索缓存键：归一化查询（小写、折叠空白）后取定长 blake2b 摘要。
+
+    大小写 / 空白不同但语义相同的查询命中同一缓存条目。
+    """
+    normalized = " ".join(query.lower().split())
+    return "search:" + hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# 空闲 DDGS 实例池：实例内部缓存各搜索引擎及其 HTTP 客户端，复用可省去重复的 DNS / TLS 握手。
+# 每次搜索独占取出一个实例（HTTP 客户端不保证线程安全），用完归还；池满或搜索失败的实例直接丢弃，
+# 其客户端随引用释放而关闭（primp 客户端无显式 close），存活实例数不随工具线程增减而累积
+_DDGS_POOL_MAX = 4
+_ddgs_pool: list[DDGS] = []
+_ddgs_pool_lock = threading.Lock()
+
+
+def _acquire_ddgs() -> DDGS:
+    """取出一个空闲 DDGS 实例，池为空时新建。"""
+    with _ddgs_pool_lock:
+        if _ddgs_pool:
+            return _ddgs_pool.pop()
+    return DDGS()
+
+
+def _release_ddgs(ddgs: DDGS) -> None:
+    """归还 DDGS 实例（池已满时丢弃）。"""
+    with _ddgs_pool_lock:
+        if len(_ddgs_pool) < _DDGS_POOL_MAX:
+            _ddgs_pool.append(ddgs)
+
 
 @tool
 def search_web(query: str) -> str:
@@ -28,10 +66,9 @@ def search_web(query: str) -> str:
         return "❌ 错误：搜索关键词不能为空"
 
     # 检查缓存（搜索结果相对稳定，可缓存）
+    cache_key = _search_cache_key(query)
     try:
         from cache import url_cache
-        # 使用查询作为缓存键（添加前缀区分 URL 缓存）
-        cache_key = f"search:{query.strip()}"
         cached = url_cache.get_cached_url(cache_key)
         if cached is not None:
             logger.info(f"✓ 搜索缓存命中: {query[:50]}")
@@ -41,42 +78,46 @@ def search_web(query: str) -> str:
 
     try:
         # 执行搜索（优化中文搜索）
-        with DDGS() as ddgs:
-            results = list(ddgs.text(
-                query=query.strip(),     # 新 API 使用 query 参数
-                safesearch='moderate',   # 适度安全搜索
-                max_results=8,           # 限制结果数量避免 token 浪费
-            ))
+        ddgs = _acquire_ddgs()
+        results = list(ddgs.text(
+            query=query.strip(),     # 新 API 使用 query 参数
+            safesearch='moderate',   # 适度安全搜索
+            max_results=8,           # 限制结果数量避免 token 浪费
+        ))
+        # 搜索失败时异常直接抛出，实例不归还（连接异常后由下次搜索新建）
+        _release_ddgs(ddgs)
 
         if not results:
             return f"⚠️ 未找到相关结果：{query}"
 
-        # 格式化搜索结果
+        # 格式化搜索结果：累计长度已超过上限后不再格式化剩余条目（反正会被截断）
+        header = f"🔍 搜索关键词: {query}\n\n"
         formatted_results = []
+        length = len(header) - 1  # 每条结果计入一个 "\n" 分隔符，首条不计
         for i, result in enumerate(results, 1):
+            if length > _MAX_OUTPUT_CHARS:
+                break
             title = result.get("title", "无标题")
             link = result.get("href", "")
             snippet = result.get("body", "")
 
-            formatted_results.append(
+            item = (
                 f"{i}. **{title}**\n"
                 f"   链接: {link}\n"
                 f"   摘要: {snippet}\n"
             )
+            formatted_results.append(item)
+            length += len(item) + 1
 
-        output = (
-            f"🔍 搜索关键词: {query}\n\n"
-            + "\n".join(formatted_results)
-        )
+        output = header + "\n".join(formatted_results)
 
         # 限制输出长度
-        if len(output) > 4000:
-            output = output[:4000] + "\n\n...[结果已截断，仅显示前 4000 字符]"
+        if len(output) > _MAX_OUTPUT_CHARS:
+            output = output[:_MAX_OUTPUT_CHARS] + f"\n\n...[结果已截断，仅显示前 {_MAX_OUTPUT_CHARS} 字符]"
 
         # 缓存搜索结果
         try:
             from cache import url_cache
-            cache_key = f"search:{query.strip()}"
             url_cache.cache_url(cache_key, output)
         except Exception as e:
             logger.warning(f"缓存搜索结果失败: {e}")
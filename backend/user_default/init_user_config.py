@@ -27,11 +27,15 @@ ENABLE_URL_CACHE=true
 ENABLE_LLM_CACHE=false
 ENABLE_PROMPT_CACHE=true
 ENABLE_TRANSLATE_CACHE=true
+ENABLE_SEMANTIC_CACHE=false
 
 URL_CACHE_TTL=3600
 LLM_CACHE_TTL=86400
 PROMPT_CACHE_TTL=600
 TRANSLATE_CACHE_TTL=604800
+SEMANTIC_CACHE_TTL=86400
+SEMANTIC_CACHE_THRESHOLD=0.95
+SEMANTIC_CACHE_MAX_ITEMS=10000
 
 CACHE_MAX_MEMORY_ITEMS=100
 CACHE_MAX_DISK_SIZE_MB=5120
@@ -355,6 +359,8 @@ graph:
     replanner:
       enabled: true           # false = 禁用重规划，步骤顺序执行到底
       skip_on_success: true   # 最后一步成功时跳过 LLM 评估
+      speculative: false      # true = 评估与下一步骤并发执行（决策为 finish/revise 时取消该步骤）
+      every_n_steps: 1        # 步骤成功时每完成 N 步才评估一次（skip_on_success: false 时生效，失败步骤始终评估）
 
     summarizer:
       enabled: true           # false = 计划完成后直接结束，不回到 agent
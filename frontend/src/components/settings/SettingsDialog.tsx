@@ -611,6 +611,7 @@ export default function SettingsDialog() {
         enable_llm_cache: false,
         enable_prompt_cache: true,
         enable_translate_cache: true,
+        enable_semantic_cache: false,
         mcp_enabled: true,
         plan_enabled: true,
         plan_revision_enabled: true,
@@ -1050,6 +1051,12 @@ export default function SettingsDialog() {
                                 onChange={(v) => updateField("enable_translate_cache", v)}
                                 hint="(翻译 API 结果)"
                             />
+                            <ToggleField
+                                label="语义缓存"
+                                checked={form.enable_semantic_cache}
+                                onChange={(v) => updateField("enable_semantic_cache", v)}
+                                hint="(相似问题复用回复，需 Embedding 模型，默认关闭)"
+                            />
                             <ToggleField
                                 label="MCP 工具缓存"
                                 checked={form.mcp_enabled}
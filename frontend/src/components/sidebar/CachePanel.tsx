@@ -37,8 +37,12 @@ const CORE_CACHE_META: Record<string, { label: string; icon: React.ElementType }
     llm: { label: "LLM 缓存", icon: Bot },
     prompt: { label: "Prompt 缓存", icon: FileText },
     translate: { label: "翻译缓存", icon: Languages },
+    semantic: { label: "语义缓存", icon: Bot },
 };
 
+// Memory-only cache types (no L2): hit rate and entry count come from L1
+const MEMORY_ONLY_TYPES = new Set(["semantic"]);
+
 function isMcpCache(id: string): boolean {
     // MCP tool caches: tool_mcp_server_tool or tool_test_mcp_tool etc.
     return id.startsWith("tool_") && id.includes("mcp");
@@ -97,9 +101,14 @@ function formatTTL(seconds: number): string {
  * Flow: request → L1 hit (done) → L1 miss → L2 hit/miss
  * So total requests = L1.hits + L2.hits + L2.misses
  */
-function getCombinedHitRate(l1: { hits: number }, l2: { hits: number; misses: number }): string {
+function getCombinedHitRate(
+    l1: { hits: number; misses: number },
+    l2: { hits: number; misses: number },
+    memoryOnly = false,
+): string {
     const totalHits = l1.hits + l2.hits;
-    const totalRequests = l1.hits + l2.hits + l2.misses;
+    // Memory-only caches have no L2: an L1 miss is a final miss
+    const totalRequests = memoryOnly ? l1.hits + l1.misses : l1.hits + l2.hits + l2.misses;
     if (totalRequests === 0) return "-";
     return ((totalHits / totalRequests) * 100).toFixed(1);
 }
@@ -107,7 +116,7 @@ function getCombinedHitRate(l1: { hits: number }, l2: { hits: number; misses: nu
 const PAGE_SIZE = 10;
 
 // Preferred display order for core types
-const CORE_ORDER = ["url", "llm", "prompt", "translate"];
+const CORE_ORDER = ["url", "llm", "prompt", "translate", "semantic"];
 
 interface CachePanelProps {
     onFileOpen?: (path: string) => void;
@@ -297,7 +306,8 @@ export default function CachePanel({ onFileOpen }: CachePanelProps) {
                 const Icon = getCacheIcon(id);
                 const label = getCacheLabel(id);
                 const isExpanded = expandedType === id;
-                const fileCount = typeStats.l2.file_count;
+                const memoryOnly = MEMORY_ONLY_TYPES.has(id);
+                const fileCount = memoryOnly ? typeStats.l1.size : typeStats.l2.file_count;
                 const sizeMB = typeStats.l2.size_mb;
 
                 return (
@@ -341,7 +351,7 @@ export default function CachePanel({ onFileOpen }: CachePanelProps) {
                                 {/* Stats summary */}
                                 <div className="flex items-center justify-between px-2 py-1.5 text-[10px] text-muted-foreground/60 bg-muted/30 rounded-lg">
                                     <span>
-                                        命中率: {getCombinedHitRate(typeStats.l1, typeStats.l2)}% | TTL: {formatTTL(typeStats.ttl)}
+                                        命中率: {getCombinedHitRate(typeStats.l1, typeStats.l2, memoryOnly)}% | TTL: {formatTTL(typeStats.ttl)}
                                     </span>
                                     <Button
                                         variant="ghost"
@@ -444,6 +444,7 @@ export interface SettingsData {
   enable_llm_cache: boolean;
   enable_prompt_cache: boolean;
   enable_translate_cache: boolean;
+  enable_semantic_cache: boolean;
   mcp_enabled: boolean;
   // Plan configuration
   plan_enabled: boolean;
@@ -1089,7 +1090,7 @@ export async function fetchRollingSummary(): Promise<string> {
 // ============================================
 // Cache API
 // ============================================
-export type CacheType = string;  // "url" | "llm" | "prompt" | "translate" | "tool_*"
+export type CacheType = string;  // "url" | "llm" | "prompt" | "translate" | "semantic" | "tool_*"
 
 export interface CacheEntryPreview {
   key: string;